@@ -0,0 +1,63 @@
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+FLUSH_SQL = """
+INSERT INTO book_activity (isbn, last_seen_at, hits)
+SELECT a.isbn, NOW(), a.hits
+FROM unnest(CAST(:isbns AS VARCHAR[]), CAST(:hits AS BIGINT[])) AS a(isbn, hits)
+WHERE EXISTS (SELECT 1 FROM books b WHERE b.isbn = a.isbn)
+ORDER BY a.isbn
+ON CONFLICT (isbn) DO UPDATE SET
+    last_seen_at = EXCLUDED.last_seen_at,
+    hits = book_activity.hits + EXCLUDED.hits
+"""
+
+
+class ActivityLog:
+    """Counts which books were searched for or viewed, in memory.
+
+    touch() only updates a dict; a background thread writes the counts to
+    book_activity every `flush_interval` seconds in one statement, so
+    requests never wait on it. Counts not yet flushed when the process
+    exits are lost, which only makes the warmer's priorities slightly stale.
+    """
+
+    def __init__(self, engine, flush_interval=10.0):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def touch(self, isbns):
+        with self._lock:
+            for isbn in isbns:
+                self._pending[isbn] = self._pending.get(isbn, 0) + 1
+            # Started on first use so that pre-fork servers get one thread
+            # per worker rather than one in the parent.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="activity-flush", daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text(FLUSH_SQL), {"isbns": list(pending), "hits": list(pending.values())})
+        except SQLAlchemyError:
+            # Activity is only a hint for the warmer; drop the batch rather
+            # than let it grow while the database is unavailable.
+            return 0
+        return len(pending)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
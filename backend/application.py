@@ -1,106 +1,142 @@
+import io
 import os
-import requests
+import hmac
+import json
+import time
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
 
-from flask import Flask, session, request, redirect, url_for, render_template, jsonify
-from flask_session import Session
+from flask import Flask, Response, session, request, redirect, url_for, render_template, jsonify
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from werkzeug.security import generate_password_hash, check_password_hash
 
+from activity import ActivityLog
+from book_data import load_book
+from book_export import EXPORT_FORMATS, export_batches
+from cache import MetadataCache
+from metrics import cache_lines, instrument, render as render_metrics, timed, upstream_lines
+from response_cache import ResponseCache
+from review_ingest import ingest_reviews, read_csv_records, read_ndjson_records
+from review_stats import STATS_COLUMNS, histogram
+from search import search_books
+from sessions import init_sessions
+from suggest import MAX_SUGGESTIONS, SuggestIndex
+from summaries import book_summary, stored_summaries
+from upstream import UpstreamClient, UpstreamError
+
 app = Flask(__name__)
 
 if not os.getenv("DATABASE_URL"):
     raise RuntimeError("DATABASE_URL is not set")
 
-app.config["SESSION_PERMANENT"] = False
-app.config["SESSION_TYPE"] = "filesystem"
-Session(app)
-
 engine = create_engine(os.getenv("DATABASE_URL"))
 db = scoped_session(sessionmaker(bind=engine))
 
 
+@app.teardown_appcontext
+def remove_db_session(exception=None):
+    # Hand the request's connection back to the pool; otherwise every
+    # server thread keeps one checked out for as long as it lives.
+    db.remove()
+
+app.config["SESSION_PERMANENT"] = False
+init_sessions(app, engine, os.getenv("SESSION_BACKEND", "filesystem"))
+instrument(app, engine)
+
+
 def require_login():
     if not session.get("user_id"):
         return redirect(url_for("login"))
     return None
 
 
-import os
-import requests
+# One pooled, retrying, circuit-broken client per upstream API. The base URLs
+# can be pointed at local stub servers for testing.
+GOOGLE_BOOKS = UpstreamClient(
+    "google_books",
+    os.getenv("GOOGLE_BOOKS_URL", "https://www.googleapis.com"),
+    timeout=15,
+    headers={"User-Agent": "Mozilla/5.0"}
+)
+GEMINI = UpstreamClient(
+    "gemini",
+    os.getenv("GEMINI_URL", "https://generativelanguage.googleapis.com"),
+    timeout=10
+)
 
-import os
-import requests
+metadata_cache = MetadataCache(
+    engine,
+    maxsize=int(os.getenv("GOOGLE_CACHE_SIZE", "2048")),
+    ttl=int(os.getenv("GOOGLE_CACHE_TTL", str(7 * 24 * 3600))),
+    negative_ttl=int(os.getenv("GOOGLE_CACHE_NEGATIVE_TTL", str(6 * 3600)))
+)
 
-GOOGLE_CACHE = {}
 
-def google_books_info(isbn):
-
-    if isbn in GOOGLE_CACHE:
-        return GOOGLE_CACHE[isbn]
-
-    try:
-        books_key = os.getenv("GOOGLE_BOOKS_API_KEY")
-
-        r = requests.get(
-            "https://www.googleapis.com/books/v1/volumes",
-            params={"q": f"isbn:{isbn}", "key": books_key},
-            timeout=15,
-            headers={"User-Agent": "Mozilla/5.0"}
-        )
-
-        if r.status_code != 200:
-            return None
-
-        data = r.json()
-        items = data.get("items", [])
-        if not items:
-            return None
+# Which books people look at, so warm_metadata.py can refresh those first.
+activity = ActivityLog(engine, flush_interval=float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "10")))
 
-        info = items[0].get("volumeInfo", {})
 
-        avg = info.get("averageRating")
-        count = info.get("ratingsCount")
-        link = info.get("infoLink") or info.get("previewLink")
+def google_books_info(isbn):
+    return metadata_cache.get(isbn, fetch_google_books)
 
-        imgs = info.get("imageLinks") or {}
-        thumb = imgs.get("thumbnail") or imgs.get("smallThumbnail")
 
-        published_date = info.get("publishedDate")
-        description = info.get("description")
+def fetch_google_books(isbn):
+    # Returns None when Google has no record of the ISBN (cached as a miss)
+    # and raises on transport or HTTP errors (not cached).
+    books_key = os.getenv("GOOGLE_BOOKS_API_KEY")
 
-        isbn_10 = None
-        isbn_13 = None
-        for ident in info.get("industryIdentifiers", []):
-            if ident.get("type") == "ISBN_10":
-                isbn_10 = ident.get("identifier")
-            elif ident.get("type") == "ISBN_13":
-                isbn_13 = ident.get("identifier")
+    r = GOOGLE_BOOKS.get(
+        "/books/v1/volumes",
+        params={"q": f"isbn:{isbn}", "key": books_key}
+    )
+    r.raise_for_status()
 
-        result = {
-            "avg": avg,
-            "count": count,
-            "link": link,
-            "thumb": thumb,
-            "publishedDate": published_date,
-            "description": description,
-            "ISBN_10": isbn_10,
-            "ISBN_13": isbn_13
-        }
+    data = r.json()
+    items = data.get("items", [])
+    if not items:
+        return None
 
-        GOOGLE_CACHE[isbn] = result
-        return result
+    info = items[0].get("volumeInfo", {})
+
+    avg = info.get("averageRating")
+    count = info.get("ratingsCount")
+    link = info.get("infoLink") or info.get("previewLink")
+
+    imgs = info.get("imageLinks") or {}
+    thumb = imgs.get("thumbnail") or imgs.get("smallThumbnail")
+
+    published_date = info.get("publishedDate")
+    description = info.get("description")
+
+    isbn_10 = None
+    isbn_13 = None
+    for ident in info.get("industryIdentifiers", []):
+        if ident.get("type") == "ISBN_10":
+            isbn_10 = ident.get("identifier")
+        elif ident.get("type") == "ISBN_13":
+            isbn_13 = ident.get("identifier")
+
+    result = {
+        "avg": avg,
+        "count": count,
+        "link": link,
+        "thumb": thumb,
+        "publishedDate": published_date,
+        "description": description,
+        "ISBN_10": isbn_10,
+        "ISBN_13": isbn_13
+    }
 
-    except Exception:
-        return None
+    return result
 
 def gemini_summarize(text_to_summarize):
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key or not text_to_summarize:
         return None
 
-    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+    path = "/v1beta/models/gemini-2.5-flash:generateContent"
     payload = {
         "contents": [{
             "parts": [{
@@ -110,7 +146,7 @@ def gemini_summarize(text_to_summarize):
     }
 
     try:
-        res = requests.post(url, params={"key": api_key}, json=payload, timeout=10)
+        res = GEMINI.post(path, params={"key": api_key}, json=payload)
         if res.status_code != 200:
             return None
 
@@ -133,8 +169,75 @@ def gemini_summarize(text_to_summarize):
 
         return summary
 
-    except Exception:
+    except (UpstreamError, ValueError):
+        return None
+
+# Google Books and Gemini lookups run on this pool, started once the book is
+# known to exist. BOOK_PAGE_BUDGET (seconds) bounds how long a render waits
+# for them; anything not ready by then is left out.
+# With ENRICH_MODE=deferred the page renders without waiting at all and the
+# browser loads the panels from /book/<isbn>/enrichment, which can afford to
+# wait longer (ENRICHMENT_BUDGET).
+ENRICH_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("ENRICH_WORKERS", "16")))
+BOOK_PAGE_BUDGET = float(os.getenv("BOOK_PAGE_BUDGET", "3.0"))
+ENRICHMENT_BUDGET = float(os.getenv("ENRICHMENT_BUDGET", "10.0"))
+ENRICH_MODE = os.getenv("ENRICH_MODE", "inline")
+
+
+def enrich_book(isbn):
+    ginfo = google_books_info(isbn)
+    description = ginfo.get("description") if ginfo else None
+    return ginfo, book_summary(engine, isbn, description, gemini_summarize)
+
+
+def cached_enrichment(isbns):
+    # (ginfo, summary) for the books that need no upstream call, looked up
+    # with two queries in all rather than two per book.
+    metadata = metadata_cache.get_many(isbns)
+    descriptions = {isbn: ginfo["description"] for isbn, ginfo in metadata.items()
+                    if ginfo and ginfo.get("description")}
+    try:
+        summaries = stored_summaries(engine, descriptions)
+    except SQLAlchemyError:
+        summaries = {}
+    return {
+        isbn: (ginfo, summaries.get(isbn)) for isbn, ginfo in metadata.items()
+        if isbn not in descriptions or isbn in summaries
+    }
+
+
+def submit_enrichment(isbn, pool=ENRICH_POOL):
+    # Runs in the request's context so upstream calls show up in its timings.
+    return pool.submit(copy_context().run, enrich_book, isbn)
+
+
+def start_enrichment(isbn):
+    if ENRICH_MODE == "deferred":
         return None
+    return submit_enrichment(isbn)
+
+
+def wait_for_enrichment(future, deadline):
+    if future is None:
+        return None, None
+    try:
+        with timed("enrichment_wait"):
+            return future.result(timeout=max(0, deadline - time.monotonic()))
+    except Exception:
+        # Timed out, or the lookup itself failed: render without it.
+        return None, None
+
+
+def enrichment_context(future, deadline):
+    ginfo, summarized_description = wait_for_enrichment(future, deadline)
+    return {
+        "ginfo": ginfo,
+        "gb_avg": ginfo["avg"] if ginfo else None,
+        "gb_count": ginfo["count"] if ginfo else None,
+        "summarized_description": summarized_description,
+        "deferred_enrichment": ENRICH_MODE == "deferred",
+    }
+
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -147,20 +250,13 @@ def index():
         if not q:
             return render_template("search.html", message="Type something to search")
 
-        like = f"%{q}%"
-        books = db.execute(
-            text(
-                "SELECT isbn, title, author, year FROM books "
-                "WHERE isbn ILIKE :like OR title ILIKE :like OR author ILIKE :like "
-                "ORDER BY title LIMIT 50"
-            ),
-            {"like": like}
-        ).fetchall()
+        books, next_cursor = search_books(db, q, after=request.form.get("after"))
+        activity.touch(book.isbn for book in books)
 
         if not books:
             return render_template("search.html", q=q, books=[], message="No matches found")
 
-        return render_template("search.html", q=q, books=books)
+        return render_template("search.html", q=q, books=books, next_cursor=next_cursor)
 
     return render_template("search.html")
 
@@ -226,27 +322,33 @@ def logout():
     return redirect(url_for("login"))
 
 
+def render_book_page(book, reviews, next_cursor, enriched, deadline, message=None):
+    return render_template(
+        "book.html",
+        book=book,
+        reviews=reviews,
+        stats=book,
+        next_cursor=next_cursor,
+        before=request.args.get("before"),
+        **enrichment_context(enriched, deadline),
+        message=message
+    )
+
+
 @app.route("/book/<string:isbn>", methods=["GET", "POST"])
 def book_page(isbn):
     gate = require_login()
     if gate:
         return gate
 
-    book = db.execute(
-        text("SELECT isbn, title, author, year FROM books WHERE isbn = :isbn"),
-        {"isbn": isbn}
-    ).fetchone()
+    book, reviews, next_cursor = load_book(db, isbn, before=request.args.get("before"))
 
     if not book:
         return render_template("error.html", error="Book not found")
 
-    ginfo = google_books_info(isbn)
-    gb_avg = ginfo["avg"] if ginfo else None
-    gb_count = ginfo["count"] if ginfo else None
-    description = ginfo["description"] if ginfo and ginfo.get("description") else None
-    summarized_description = gemini_summarize(description)
-
-
+    activity.touch([isbn])
+    deadline = time.monotonic() + BOOK_PAGE_BUDGET
+    enriched = start_enrichment(isbn)
 
     if request.method == "POST":
         rating_raw = request.form.get("rating")
@@ -258,32 +360,8 @@ def book_page(isbn):
             rating = 0
 
         if rating < 1 or rating > 5 or not review_text:
-            reviews = db.execute(
-                text(
-                    "SELECT u.username, r.rating, r.review_text, r.created_at "
-                    "FROM reviews r JOIN users u ON r.user_id = u.id "
-                    "WHERE r.isbn = :isbn ORDER BY r.created_at DESC"
-                ),
-                {"isbn": isbn}
-            ).fetchall()
-
-            stats = db.execute(
-                text(
-                    "SELECT COUNT(*) AS count, COALESCE(AVG(rating), 0) AS avg "
-                    "FROM reviews WHERE isbn = :isbn"
-                ),
-                {"isbn": isbn}
-            ).fetchone()
-
-            return render_template(
-                "book.html",
-                book=book,
-                reviews=reviews,
-                stats=stats,
-                gb_avg=gb_avg,
-                gb_count=gb_count,
-                ginfo=ginfo,
-                summarized_description=summarized_description,
+            return render_book_page(
+                book, reviews, next_cursor, enriched, deadline,
                 message="Please select 1–5 stars and write a comment."
             )
 
@@ -293,32 +371,8 @@ def book_page(isbn):
         ).fetchone()
 
         if existing:
-            reviews = db.execute(
-                text(
-                    "SELECT u.username, r.rating, r.review_text, r.created_at "
-                    "FROM reviews r JOIN users u ON r.user_id = u.id "
-                    "WHERE r.isbn = :isbn ORDER BY r.created_at DESC"
-                ),
-                {"isbn": isbn}
-            ).fetchall()
-
-            stats = db.execute(
-                text(
-                    "SELECT COUNT(*) AS count, COALESCE(AVG(rating), 0) AS avg "
-                    "FROM reviews WHERE isbn = :isbn"
-                ),
-                {"isbn": isbn}
-            ).fetchone()
-
-            return render_template(
-                "book.html",
-                book=book,
-                reviews=reviews,
-                stats=stats,
-                gb_avg=gb_avg,
-                gb_count=gb_count,
-                ginfo=ginfo,
-                summarized_description=summarized_description,
+            return render_book_page(
+                book, reviews, next_cursor, enriched, deadline,
                 message="You already have a review for this book!"
             )
 
@@ -331,91 +385,109 @@ def book_page(isbn):
                 {"uid": session["user_id"], "isbn": isbn, "r": rating, "t": review_text}
             )
             db.commit()
+            api_cache.invalidate(isbn)
         except IntegrityError:
             db.rollback()
 
-            reviews = db.execute(
-                text(
-                    "SELECT u.username, r.rating, r.review_text, r.created_at "
-                    "FROM reviews r JOIN users u ON r.user_id = u.id "
-                    "WHERE r.isbn = :isbn ORDER BY r.created_at DESC"
-                ),
-                {"isbn": isbn}
-            ).fetchall()
-
-            stats = db.execute(
-                text(
-                    "SELECT COUNT(*) AS count, COALESCE(AVG(rating), 0) AS avg "
-                    "FROM reviews WHERE isbn = :isbn"
-                ),
-                {"isbn": isbn}
-            ).fetchone()
-
-            return render_template(
-                "book.html",
-                book=book,
-                reviews=reviews,
-                stats=stats,
-                gb_avg=gb_avg,
-                gb_count=gb_count,
-                ginfo=ginfo,
-                summarized_description=summarized_description,
+            return render_book_page(
+                book, reviews, next_cursor, enriched, deadline,
                 message="You already have a review for this book!"
             )
 
         return redirect(url_for("book_page", isbn=isbn))
 
-    reviews = db.execute(
-        text(
-            "SELECT u.username, r.rating, r.review_text, r.created_at "
-            "FROM reviews r JOIN users u ON r.user_id = u.id "
-            "WHERE r.isbn = :isbn ORDER BY r.created_at DESC"
-        ),
-        {"isbn": isbn}
-    ).fetchall()
+    return render_book_page(book, reviews, next_cursor, enriched, deadline)
 
-    stats = db.execute(
-        text(
-            "SELECT COUNT(*) AS count, COALESCE(AVG(rating), 0) AS avg "
-            "FROM reviews WHERE isbn = :isbn"
-        ),
-        {"isbn": isbn}
-    ).fetchone()
-
-    return render_template(
-        "book.html",
-        book=book,
-        reviews=reviews,
-        stats=stats,
-        gb_avg=gb_avg,
-        gb_count=gb_count,
-        ginfo=ginfo,
-        summarized_description=summarized_description
-    )
 
+@app.route("/book/<string:isbn>/enrichment")
+def book_enrichment(isbn):
+    gate = require_login()
+    if gate:
+        return jsonify({"error": "Login required"}), 401
 
-@app.route("/api/<string:isbn>")
-def api(isbn):
     book = db.execute(
-        text("SELECT isbn, title, author, year FROM books WHERE isbn = :isbn"),
+        text("SELECT isbn FROM books WHERE isbn = :isbn"),
         {"isbn": isbn}
     ).fetchone()
 
     if not book:
         return jsonify({"error": "Book not found"}), 404
 
-    ginfo = google_books_info(isbn) or {}
+    deadline = time.monotonic() + ENRICHMENT_BUDGET
+    ginfo, summarized = wait_for_enrichment(submit_enrichment(isbn), deadline)
+    ginfo = ginfo or {}
+
+    return jsonify({
+        "avg": ginfo.get("avg"),
+        "count": ginfo.get("count"),
+        "link": ginfo.get("link"),
+        "thumb": ginfo.get("thumb"),
+        "summarizedDescription": summarized
+    })
+
+
+# Typeahead, answered from an in-memory index of the catalogue. Each worker
+# starts building it in the background when it serves its first request (not
+# at import, so the CLIs that import this module do not pay for it) and
+# returns no suggestions until it is ready. New and changed books are picked
+# up within SUGGEST_REFRESH seconds.
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "10"))
+suggest_index = SuggestIndex(engine, refresh_interval=float(os.getenv("SUGGEST_REFRESH", "30")))
+
+
+@app.before_request
+def start_suggest_index():
+    suggest_index.start_build()
+
+
+@app.route("/api/suggest")
+def suggest():
+    q = (request.args.get("q") or "").strip()
+    try:
+        limit = min(max(int(request.args.get("limit", SUGGEST_LIMIT)), 1), MAX_SUGGESTIONS)
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    return jsonify({"q": q, "suggestions": suggest_index.suggest(q, limit) if q else []})
+
+
+@app.route("/api/cache/stats")
+def cache_stats():
+    return jsonify({
+        "google_books": metadata_cache.stats(),
+        "api_responses": api_cache.stats(),
+        "suggest_index": suggest_index.stats()
+    })
+
+
+@app.route("/api/upstream/stats")
+def upstream_stats():
+    return jsonify({client.name: client.stats() for client in (GOOGLE_BOOKS, GEMINI)})
+
+
+@app.route("/metrics")
+def metrics():
+    # Prometheus text format. Every worker process reports its own numbers.
+    body = render_metrics(
+        upstream_lines((GOOGLE_BOOKS, GEMINI))
+        + cache_lines("metadata_cache", "Google Books metadata cache events.", metadata_cache.stats())
+        + cache_lines("api_response_cache", "/api/<isbn> response cache events.", api_cache.stats())
+    )
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+def book_payload(book, ginfo, summarized):
+    # `book` must carry the STATS_COLUMNS aggregates for the site's own reviews.
+    ginfo = ginfo or {}
 
     published_date = ginfo.get("publishedDate")
     isbn_10 = ginfo.get("ISBN_10")
     isbn_13 = ginfo.get("ISBN_13")
-    review_count = ginfo.get("count")          
-    average_rating = ginfo.get("avg")          
+    review_count = ginfo.get("count")
+    average_rating = ginfo.get("avg")
     description = ginfo.get("description")
 
-    summarized = gemini_summarize(description) if description else None
-
-    return jsonify({
+    return {
         "title": book.title if book.title is not None else None,
         "author": book.author if book.author is not None else None,
         "publishedDate": published_date if published_date is not None else None,
@@ -424,5 +496,193 @@ def api(isbn):
         "reviewCount": review_count if review_count is not None else None,
         "averageRating": average_rating if average_rating is not None else None,
         "description": description if description is not None else None,
-        "summarizedDescription": summarized if summarized is not None else None
-    })
\ No newline at end of file
+        "summarizedDescription": summarized if summarized is not None else None,
+        "siteReviewCount": book.rating_count,
+        "siteAverageRating": round(book.rating_avg, 2),
+        "siteRatingHistogram": histogram(book)
+    }
+
+
+# Rendered /api/<isbn> responses. A worker drops its own entry when a review
+# for the ISBN is posted through it; other workers serve theirs until
+# API_CACHE_TTL runs out, which is also the max-age clients are told to use.
+API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", "60"))
+API_CACHE_CONTROL = os.getenv("API_CACHE_CONTROL", f"public, max-age={API_CACHE_TTL}")
+api_cache = ResponseCache(maxsize=int(os.getenv("API_CACHE_SIZE", "4096")), ttl=API_CACHE_TTL)
+
+
+@app.route("/api/<string:isbn>")
+def api(isbn):
+    entry = api_cache.get(isbn)
+    if entry is None:
+        entry = build_api_response(isbn)
+        if entry is None:
+            return jsonify({"error": "Book not found"}), 404
+
+    activity.touch([isbn])
+    response = Response(entry["body"], mimetype="application/json")
+    response.set_etag(entry["etag"])
+    response.last_modified = entry["last_modified"]
+    response.headers["Cache-Control"] = API_CACHE_CONTROL
+    return response.make_conditional(request)
+
+
+def build_api_response(isbn):
+    book = db.execute(
+        text(
+            f"SELECT b.isbn, b.title, b.author, b.year, {STATS_COLUMNS} FROM books b "
+            "LEFT JOIN book_stats s ON s.isbn = b.isbn WHERE b.isbn = :isbn"
+        ),
+        {"isbn": isbn}
+    ).fetchone()
+
+    if not book:
+        return None
+
+    deadline = time.monotonic() + BOOK_PAGE_BUDGET
+    enriched = submit_enrichment(isbn)
+    ginfo, summarized = wait_for_enrichment(enriched, deadline)
+
+    entry = api_cache.build(app.json.dumps(book_payload(book, ginfo, summarized)).encode() + b"\n")
+    # A response cut short by the budget is served but not cached, so the
+    # missing Google/Gemini fields are filled in on the next request.
+    if enriched.done():
+        api_cache.put(isbn, entry)
+    return entry
+
+
+@app.route("/api/export")
+def api_export():
+    # The whole catalogue with review aggregates, streamed batch by batch
+    # from a server-side cursor; memory use does not grow with the catalogue.
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(sorted(EXPORT_FORMATS))}"}), 400
+
+    to_chunks, mimetype = EXPORT_FORMATS[fmt]
+    response = Response(to_chunks(export_batches(engine)), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename=books.{fmt}"
+    return response
+
+
+# Bulk review import for migrations, e.g.
+#   curl -H "Authorization: Bearer $INGEST_TOKEN" -H "Content-Type: text/csv" \
+#        --data-binary @reviews.csv http://localhost:5000/api/reviews/import
+# Disabled unless INGEST_TOKEN is set. The body is read as a stream and
+# loaded in chunks; at most INGEST_REJECTS_SHOWN rejected rows are returned.
+INGEST_REJECTS_SHOWN = 1000
+
+
+@app.route("/api/reviews/import", methods=["POST"])
+def api_reviews_import():
+    token = os.getenv("INGEST_TOKEN")
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not token or not hmac.compare_digest(supplied.encode(), token.encode()):
+        return jsonify({"error": "Not authorized"}), 403
+
+    ndjson = request.mimetype in ("application/x-ndjson", "application/jsonl")
+    if not ndjson and request.mimetype != "text/csv":
+        return jsonify({"error": "Send text/csv or application/x-ndjson"}), 415
+
+    body = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+    records = read_ndjson_records(body) if ndjson else read_csv_records(body)
+    rejects = []
+
+    def on_reject(line, reason, record):
+        if len(rejects) < INGEST_REJECTS_SHOWN:
+            rejects.append({"line": line, "reason": reason, "record": record})
+
+    counts = ingest_reviews(
+        engine, records, on_reject=on_reject,
+        create_users=request.args.get("create_users") == "1"
+    )
+    if counts["loaded"]:
+        api_cache.clear()
+    return jsonify(dict(counts, rejects=rejects))
+
+
+# Batch lookups run on their own, smaller pool so they cannot tie up the
+# enrichment pool that book pages wait on. API_BATCH_BUDGET bounds the whole
+# batch, not each book; lookups not started by then are cancelled. The body
+# limit allows a generous 64 bytes of JSON per ISBN.
+API_BATCH_MAX = int(os.getenv("API_BATCH_MAX", "500"))
+API_BATCH_BUDGET = float(os.getenv("API_BATCH_BUDGET", "10.0"))
+BATCH_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("API_BATCH_WORKERS", "4")))
+
+
+def cancel_pending(futures):
+    for future in futures:
+        future.cancel()
+
+
+@app.route("/api/batch", methods=["GET", "POST"])
+def api_batch():
+    if request.content_length and request.content_length > API_BATCH_MAX * 64:
+        return jsonify({"error": "Request too large"}), 413
+
+    if request.method == "POST":
+        body = request.get_json(silent=True)
+        isbns = body.get("isbns") if isinstance(body, dict) else None
+    else:
+        isbns = request.args.get("isbns", "").split(",")
+
+    if not isinstance(isbns, list) or not all(isinstance(i, str) for i in isbns):
+        return jsonify({"error": "isbns must be a list of strings"}), 400
+
+    isbns = list(dict.fromkeys(i.strip() for i in isbns if i.strip()))
+    if not isbns:
+        return jsonify({"error": "No ISBNs given"}), 400
+    if len(isbns) > API_BATCH_MAX:
+        return jsonify({"error": f"At most {API_BATCH_MAX} ISBNs per request"}), 413
+
+    books = {
+        row.isbn: row for row in db.execute(
+            text(
+                f"SELECT b.isbn, b.title, b.author, b.year, {STATS_COLUMNS} FROM books b "
+                "LEFT JOIN book_stats s ON s.isbn = b.isbn WHERE b.isbn = ANY(:isbns)"
+            ),
+            {"isbns": isbns}
+        )
+    }
+
+    # Only books missing from the caches go to the pool.
+    deadline = time.monotonic() + API_BATCH_BUDGET
+    ready = cached_enrichment(list(books))
+    futures = {submit_enrichment(isbn, BATCH_POOL): isbn for isbn in books if isbn not in ready}
+    missing = [isbn for isbn in isbns if isbn not in books]
+
+    ndjson = (request.args.get("format") == "ndjson"
+              or request.accept_mimetypes.best == "application/x-ndjson")
+
+    if ndjson:
+        def generate():
+            for isbn in missing:
+                yield json.dumps({"isbn": isbn, "error": "Book not found"}) + "\n"
+            for isbn, (ginfo, summarized) in ready.items():
+                yield json.dumps(dict(isbn=isbn, **book_payload(books[isbn], ginfo, summarized))) + "\n"
+
+            try:
+                for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+                    isbn = futures.pop(future)
+                    ginfo, summarized = wait_for_enrichment(future, deadline)
+                    yield json.dumps(dict(isbn=isbn, **book_payload(books[isbn], ginfo, summarized))) + "\n"
+            except FuturesTimeout:
+                pass
+            finally:
+                # Also reached when the client disconnects mid-stream.
+                cancel_pending(futures)
+
+            for isbn in futures.values():
+                yield json.dumps(dict(isbn=isbn, **book_payload(books[isbn], None, None))) + "\n"
+
+        return Response(generate(), mimetype="application/x-ndjson")
+
+    results = {isbn: {"error": "Book not found"} for isbn in missing}
+    for isbn, (ginfo, summarized) in ready.items():
+        results[isbn] = book_payload(books[isbn], ginfo, summarized)
+    for future, isbn in futures.items():
+        ginfo, summarized = wait_for_enrichment(future, deadline)
+        results[isbn] = book_payload(books[isbn], ginfo, summarized)
+    cancel_pending(futures)
+
+    return jsonify(results)
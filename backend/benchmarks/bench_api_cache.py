@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import percentile
+from stubs import StubConfig, start_stubs
+
+
+def run(app, isbns, threads, requests_per_thread, conditional, seed=1):
+    samples = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def worker(n):
+        rng = random.Random(seed + n)
+        client = app.test_client()
+        etags = {}
+        local = []
+        local_statuses = {}
+
+        for _ in range(requests_per_thread):
+            isbn = rng.choice(isbns)
+            headers = {"If-None-Match": f'"{etags[isbn]}"'} if conditional and isbn in etags else {}
+
+            start = time.perf_counter()
+            response = client.get(f"/api/{isbn}", headers=headers)
+            local.append((time.perf_counter() - start) * 1000)
+
+            local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+            if response.headers.get("ETag"):
+                etags[isbn] = response.headers["ETag"].strip('"')
+
+        with lock:
+            samples.extend(local)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/<isbn> throughput with and without HTTP caching")
+    parser.add_argument("--isbns", type=int, default=50, help="distinct ISBNs in the workload")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="requests per thread")
+    parser.add_argument("--google-latency", type=float, default=0.2)
+    parser.add_argument("--gemini-latency", type=float, default=1.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    _, url = start_stubs(StubConfig(args.google_latency, args.gemini_latency))
+    os.environ["GOOGLE_BOOKS_URL"] = url
+    os.environ["GEMINI_URL"] = url
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    os.environ["BOOK_PAGE_BUDGET"] = "30"
+
+    import application
+    from sqlalchemy import text
+
+    with application.engine.connect() as conn:
+        isbns = conn.execute(
+            text("SELECT isbn FROM books ORDER BY isbn LIMIT :n"), {"n": args.isbns}
+        ).scalars().all()
+
+    # Prime the metadata cache and summary store so every mode measures the
+    # steady state rather than first-time upstream calls.
+    client = application.app.test_client()
+    for isbn in isbns:
+        client.get(f"/api/{isbn}")
+
+    maxsize = application.api_cache.maxsize
+    results = {}
+    for mode in ("uncached", "cached", "conditional"):
+        application.api_cache.clear()
+        application.api_cache.maxsize = 0 if mode == "uncached" else maxsize
+        results[mode] = run(application.app, isbns, args.threads, args.requests, mode == "conditional")
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    base = results["uncached"]["rps"]
+    for mode, r in results.items():
+        print(f"{mode:<12} {r['rps']:>9} req/s ({r['rps'] / base:.1f}x)  "
+              f"p50 {r['p50_ms']} ms  p99 {r['p99_ms']} ms  statuses {r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from common import percentile
+from search import search_books
+from synthetic import clear_synthetic, read_books, seed_catalogue
+
+
+def sample_queries(base, n, seed=7):
+    # A mix of the things people type into the search box: a word from a
+    # title, an author's surname, a few leading ISBN digits and a two-word
+    # title fragment.
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        isbn, title, author, _ = rng.choice(base)
+        words = title.split()
+        kind = rng.randrange(4)
+        if kind == 0 and words:
+            queries.append(rng.choice(words))
+        elif kind == 1:
+            queries.append(author.split()[-1])
+        elif kind == 2:
+            queries.append(isbn[:6])
+        else:
+            queries.append(" ".join(words[:2]) or title)
+    return [q for q in queries if q.strip()]
+
+
+def run(db, queries, pages):
+    latencies = []
+    for q in queries:
+        after = None
+        for _ in range(pages):
+            start = time.perf_counter()
+            rows, after = search_books(db, q, after=after)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not after:
+                break
+    db.rollback()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search latency benchmark (uses a scratch database)")
+    parser.add_argument("--scale", type=int, default=100, help="catalogue size as a multiple of books.csv")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--pages", type=int, default=2, help="result pages to walk per query")
+    parser.add_argument("--keep", action="store_true", help="leave the synthetic rows in place")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        raise RuntimeError("DATABASE_URL is not set")
+
+    engine = create_engine(os.getenv("DATABASE_URL"))
+    db = scoped_session(sessionmaker(bind=engine))
+
+    base = read_books()
+    if args.scale > 1:
+        _, added = seed_catalogue(engine, args.scale)
+        print(f"Seeded {added} synthetic books ({args.scale}x books.csv)", file=sys.stderr)
+
+    try:
+        queries = sample_queries(base, args.queries)
+        run(db, queries[:20], 1)
+        latencies = run(db, queries, args.pages)
+    finally:
+        if args.scale > 1 and not args.keep:
+            clear_synthetic(engine)
+
+    result = {
+        "scale": args.scale,
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.mean(latencies), 2),
+    }
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"{result['requests']} searches at {args.scale}x: "
+              f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, mean {result['mean_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
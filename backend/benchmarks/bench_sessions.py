@@ -0,0 +1,157 @@
+import argparse
+import io
+import json
+import os
+import secrets
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, session
+from sqlalchemy import create_engine, text
+
+from common import percentile
+from sessions import init_sessions
+
+BENCH_PREFIX = "bench-"
+
+
+def make_app(backend, engine, file_dir):
+    app = Flask(__name__)
+    app.config["SESSION_PERMANENT"] = False
+
+    if backend == "filesystem":
+        app.config["SESSION_FILE_DIR"] = file_dir
+        app.config["SESSION_FILE_THRESHOLD"] = 0
+    if backend != "none":
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            init_sessions(app, engine, backend)
+
+    # The "none" baseline serves the same routes without touching the
+    # session, so the difference to it is the backend's own overhead.
+    stateless = backend == "none"
+
+    @app.route("/login")
+    def login():
+        if not stateless:
+            session["user_id"] = 1
+            session["username"] = "bench"
+        return "ok"
+
+    @app.route("/read")
+    def read():
+        return "ok" if stateless else str(session.get("user_id"))
+
+    @app.route("/write")
+    def write():
+        if not stateless:
+            session["visits"] = session.get("visits", 0) + 1
+        return "ok"
+
+    return app
+
+
+def seed_postgres(engine, count):
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        buf = io.StringIO()
+        for i in range(count):
+            buf.write(f'{BENCH_PREFIX}{i}\t{{"user_id": {i}, "username": "user{i}"}}\t2099-01-01\n')
+        buf.seek(0)
+        cur.copy_expert("COPY sessions (sid, data, expires_at) FROM STDIN", buf)
+        cur.execute("ANALYZE sessions")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def clear_postgres(engine):
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM sessions WHERE sid LIKE :p OR data ->> 'username' = 'bench'"),
+            {"p": f"{BENCH_PREFIX}%"}
+        )
+
+
+def seed_files(app, count):
+    cache = app.session_interface.cache
+    for i in range(count):
+        cache.set(f"session:{BENCH_PREFIX}{i}", {"user_id": i, "username": f"user{i}"})
+
+
+def measure(app, path, requests):
+    client = app.test_client()
+    client.get("/login")
+    for _ in range(50):
+        client.get(path)
+
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get(path)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request session overhead by backend")
+    parser.add_argument("--backends", default="none,cookie,filesystem,postgres")
+    parser.add_argument("--sizes", default="10000,1000000", help="live sessions to seed before measuring")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    engine = None
+    if "postgres" in backends:
+        if not os.getenv("DATABASE_URL"):
+            raise RuntimeError("DATABASE_URL is not set")
+        engine = create_engine(os.getenv("DATABASE_URL"))
+    os.environ.setdefault("SECRET_KEY", secrets.token_hex(16))
+
+    results = []
+    for size in (int(n) for n in args.sizes.split(",")):
+        for backend in backends:
+            file_dir = tempfile.mkdtemp(prefix="sessions-")
+            try:
+                app = make_app(backend, engine, file_dir)
+                if backend == "postgres":
+                    clear_postgres(engine)
+                    seed_postgres(engine, size)
+                elif backend == "filesystem":
+                    seed_files(app, size)
+
+                for path in ("/read", "/write"):
+                    samples = measure(app, path, args.requests)
+                    results.append({
+                        "backend": backend,
+                        "sessions": size,
+                        "request": path.strip("/"),
+                        "p50_ms": round(percentile(samples, 50), 3),
+                        "p99_ms": round(percentile(samples, 99), 3),
+                        "mean_ms": round(statistics.mean(samples), 3),
+                    })
+            finally:
+                shutil.rmtree(file_dir, ignore_errors=True)
+                if backend == "postgres":
+                    clear_postgres(engine)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"{'backend':<11} {'sessions':>9} {'request':<6} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for r in results:
+        print(f"{r['backend']:<11} {r['sessions']:>9} {r['request']:<6} "
+              f"{r['p50_ms']:>8} {r['p99_ms']:>8} {r['mean_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
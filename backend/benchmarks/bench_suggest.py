@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+
+from bench_search import sample_queries
+from common import percentile
+from suggest import SuggestIndex
+from synthetic import clear_synthetic, read_books, seed_catalogue
+
+
+def typed_prefixes(queries):
+    # Every prefix a user would send while typing each query.
+    return [q[:n] for q in queries for n in range(1, len(q) + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Typeahead index build time, size and query latency")
+    parser.add_argument("--scale", type=int, default=10, help="catalogue size as a multiple of books.csv")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--keep", action="store_true", help="leave the synthetic rows in place")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        raise RuntimeError("DATABASE_URL is not set")
+    engine = create_engine(os.getenv("DATABASE_URL"))
+
+    base = read_books()
+    if args.scale > 1:
+        seed_catalogue(engine, args.scale)
+
+    try:
+        index = SuggestIndex(engine, refresh_interval=float("inf"))
+        start = time.perf_counter()
+        index.build()
+        build_s = time.perf_counter() - start
+
+        prefixes = typed_prefixes(sample_queries(base, args.queries))
+        latencies = []
+        for q in prefixes:
+            start = time.perf_counter()
+            index.suggest(q)
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        if args.scale > 1 and not args.keep:
+            clear_synthetic(engine)
+
+    stats = index.stats()
+    result = {
+        "scale": args.scale,
+        "books": stats["rows"],
+        "index_mb": round(stats["bytes"] / 2 ** 20, 1),
+        "build_s": round(build_s, 2),
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"{result['books']} books: {result['index_mb']} MB, built in {result['build_s']} s; "
+              f"{result['requests']} prefixes p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+def percentile(samples, pct):
+    # Nearest-rank percentile of a list of latencies.
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
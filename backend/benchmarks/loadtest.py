@@ -0,0 +1,276 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from sqlalchemy import create_engine, text
+
+from bench_search import sample_queries
+from common import percentile
+from stubs import StubConfig, start_stubs
+from synthetic import clear_synthetic, read_books, seed_catalogue
+
+USER_PREFIX = "loadtest-"
+
+# Relative weights of each action in a virtual user's session.
+DEFAULT_MIX = "login=2,search=30,book=38,review=5,api=25"
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("login", "search", "book", "review", "api"):
+            raise SystemExit(f"Unknown action in --mix: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+class HttpClient:
+    """Same calls as Flask's test client, against a running server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+    def get(self, path, **kwargs):
+        return self.session.get(self.base_url + path, allow_redirects=False, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.session.post(self.base_url + path, allow_redirects=False, **kwargs)
+
+
+class VirtualUser:
+    def __init__(self, client, name, rng, isbns, queries, record):
+        self.client = client
+        self.name = name
+        self.rng = rng
+        self.isbns = isbns
+        self.queries = queries
+        self.record = record
+        self.reviewed = set()
+
+    def timed(self, endpoint, call, ok=(200, 302, 304)):
+        start = time.perf_counter()
+        try:
+            status = call().status_code
+        except requests.RequestException:
+            status = 0
+        self.record(endpoint, (time.perf_counter() - start) * 1000, status in ok)
+
+    def register(self):
+        form = {"username": self.name, "password": "loadtest"}
+        self.timed("register", lambda: self.client.post("/register", data=form))
+
+    def login(self):
+        form = {"username": self.name, "password": "loadtest"}
+        self.timed("login", lambda: self.client.post("/login", data=form))
+
+    def search(self):
+        q = self.rng.choice(self.queries)
+        self.timed("search", lambda: self.client.post("/", data={"q": q}))
+
+    def book(self):
+        isbn = self.rng.choice(self.isbns)
+        self.timed("book", lambda: self.client.get(f"/book/{isbn}"))
+
+    def review(self):
+        isbn = self.rng.choice(self.isbns)
+        if isbn in self.reviewed:
+            return self.book()
+        self.reviewed.add(isbn)
+        form = {"rating": str(self.rng.randint(1, 5)), "review_text": "Load test review."}
+        self.timed("review", lambda: self.client.post(f"/book/{isbn}", data=form))
+
+    def api(self):
+        isbn = self.rng.choice(self.isbns)
+        self.timed("api", lambda: self.client.get(f"/api/{isbn}"))
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.enabled = False
+        self._lock = threading.Lock()
+
+    def __call__(self, endpoint, ms, ok):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(ms)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+def summarize(samples, errors, elapsed):
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+    }
+
+
+def run(make_client, args, isbns, queries, run_id):
+    mix = parse_mix(args.mix)
+    actions, weights = list(mix), list(mix.values())
+    recorder = Recorder()
+    barrier = threading.Barrier(args.users + 1)
+
+    def virtual_user(n):
+        rng = random.Random(args.seed * 1000 + n)
+        user = VirtualUser(make_client(), f"{USER_PREFIX}{run_id}-{n}", rng, isbns, queries, recorder)
+        user.register()
+        user.login()
+        for _ in range(args.warmup):
+            getattr(user, rng.choices(actions, weights)[0])()
+        barrier.wait()
+        for _ in range(args.requests):
+            getattr(user, rng.choices(actions, weights)[0])()
+
+    threads = [threading.Thread(target=virtual_user, args=(n,)) for n in range(args.users)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    recorder.enabled = True
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {
+        name: summarize(samples, recorder.errors.get(name, 0), elapsed)
+        for name, samples in sorted(recorder.samples.items())
+    }
+    everything = [ms for samples in recorder.samples.values() for ms in samples]
+    return endpoints, summarize(everything, sum(recorder.errors.values()), elapsed), elapsed
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\nvs {baseline_path} ({baseline.get('commit')})")
+    print(f"{'endpoint':<10} {'rps':>14} {'p50 ms':>18} {'p99 ms':>18}")
+    for name, now in sorted(result["endpoints"].items()):
+        then = baseline["endpoints"].get(name)
+        if not then:
+            continue
+        print(f"{name:<10} " + " ".join(
+            f"{then[key]:>7} -> {now[key]:<7}" for key in ("rps", "p50_ms", "p99_ms")
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the app with a realistic mix of requests")
+    parser.add_argument("--url", help="drive a running server instead of the app in-process; "
+                                      "point its GOOGLE_BOOKS_URL/GEMINI_URL at stubs.py yourself")
+    parser.add_argument("--scale", type=int, default=1, help="catalogue size as a multiple of books.csv")
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=200, help="measured actions per user")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured actions per user first")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--hot-books", type=int, default=1000, help="books the users pick from")
+    parser.add_argument("--cold", action="store_true", help="drop cached metadata for those books first")
+    parser.add_argument("--google-latency", type=float, default=0.2)
+    parser.add_argument("--gemini-latency", type=float, default=1.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="leave synthetic books and test users in place")
+    parser.add_argument("--output", help="write the JSON result to this file")
+    parser.add_argument("--compare", help="print the change against an earlier --output file")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        raise RuntimeError("DATABASE_URL is not set")
+    engine = create_engine(os.getenv("DATABASE_URL"))
+
+    base = read_books()
+    if args.scale > 1:
+        _, added = seed_catalogue(engine, args.scale)
+        print(f"Seeded {added} synthetic books ({args.scale}x books.csv)", file=sys.stderr)
+
+    with engine.connect() as conn:
+        all_isbns = conn.execute(text("SELECT isbn FROM books ORDER BY isbn")).scalars().all()
+    isbns = random.Random(args.seed).sample(all_isbns, min(args.hot_books, len(all_isbns)))
+    queries = sample_queries(base, 500, seed=args.seed)
+
+    if args.cold:
+        with engine.begin() as conn:
+            for table in ("book_metadata", "book_summaries"):
+                conn.execute(text(f"DELETE FROM {table} WHERE isbn = ANY(:isbns)"), {"isbns": isbns})
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        config = StubConfig(args.google_latency, args.gemini_latency, args.jitter, args.error_rate)
+        _, stub_url = start_stubs(config)
+        os.environ["GOOGLE_BOOKS_URL"] = stub_url
+        os.environ["GEMINI_URL"] = stub_url
+        os.environ.setdefault("GEMINI_API_KEY", "stub")
+
+        import application
+        make_client = application.app.test_client
+
+    run_id = f"{int(time.time())}-{os.getpid()}"
+    try:
+        endpoints, total, elapsed = run(make_client, args, isbns, queries, run_id)
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text("DELETE FROM users WHERE username LIKE :p"), {"p": f"{USER_PREFIX}{run_id}-%"})
+            if args.scale > 1:
+                clear_synthetic(engine)
+
+    result = {
+        "commit": git_commit(),
+        "target": args.url or "in-process",
+        "config": {k: getattr(args, k) for k in (
+            "scale", "users", "requests", "warmup", "mix", "hot_books", "cold",
+            "google_latency", "gemini_latency", "jitter", "error_rate", "seed"
+        )},
+        "elapsed_s": round(elapsed, 2),
+        "total": total,
+        "endpoints": endpoints,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, r in list(endpoints.items()) + [("total", total)]:
+            print(f"{name:<10} {r['requests']:>9} {r['errors']:>7} {r['rps']:>8} "
+                  f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubConfig:
+    # Mean latency in seconds per upstream (uniform +/- jitter) and the
+    # fraction of requests answered with a 503.
+    def __init__(self, google_latency=0.0, gemini_latency=0.0, jitter=0.0, error_rate=0.0):
+        self.google_latency = google_latency
+        self.gemini_latency = gemini_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = {"google_books": 0, "gemini": 0}
+
+
+def make_handler(config):
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def delay(self, upstream, latency):
+            with lock:
+                config.requests[upstream] += 1
+            time.sleep(max(0.0, latency + random.uniform(-config.jitter, config.jitter)))
+            return random.random() >= config.error_rate
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/books/v1/volumes":
+                return self.reply(404, {})
+            if not self.delay("google_books", config.google_latency):
+                return self.reply(503, {})
+
+            isbn = parse_qs(url.query).get("q", ["isbn:"])[0].partition(":")[2]
+            seed = zlib.crc32(isbn.encode())
+            self.reply(200, {"items": [{"volumeInfo": {
+                "averageRating": 3.5 + (seed % 15) / 10,
+                "ratingsCount": seed % 5000,
+                "infoLink": f"https://books.example/{isbn}",
+                "publishedDate": "2001",
+                "description": f"Stub description for {isbn}. " * 8,
+                "industryIdentifiers": [{"type": "ISBN_10", "identifier": isbn}],
+            }}]})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if not self.path.startswith("/v1beta/models/"):
+                return self.reply(404, {})
+            if not self.delay("gemini", config.gemini_latency):
+                return self.reply(503, {})
+
+            self.reply(200, {"candidates": [{"content": {"parts": [{"text": "A short stub summary."}]}}]})
+
+    return Handler
+
+
+def start_stubs(config, port=0):
+    # Serves both the Google Books and Gemini routes from one local server;
+    # point GOOGLE_BOOKS_URL and GEMINI_URL at the returned base URL.
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Google Books / Gemini stub server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--google-latency", type=float, default=0.2)
+    parser.add_argument("--gemini-latency", type=float, default=1.0)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_stubs(
+        StubConfig(args.google_latency, args.gemini_latency, args.jitter, args.error_rate),
+        port=args.port
+    )
+    print(f"Stub upstreams on {url} (set GOOGLE_BOOKS_URL and GEMINI_URL to this)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import csv
+import io
+import os
+import random
+
+from sqlalchemy import text
+
+BOOKS_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "books.csv")
+
+# Synthetic ISBNs start with "S" so they can never collide with (or be
+# mistaken for) a real row from books.csv.
+SYNTHETIC_PREFIX = "S"
+
+CHUNK_ROWS = 50000
+
+
+def read_books(path=BOOKS_CSV):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            (row["isbn"].strip(), row["title"].strip(), row["author"].strip(), int(row["year"]))
+            for row in csv.DictReader(f)
+        ]
+
+
+def generate_books(base, copies, seed=551):
+    # Each copy reuses a real title with one word swapped for another word
+    # from the catalogue and a real author picked at random, so the value
+    # distribution (and therefore search selectivity) stays close to books.csv.
+    rng = random.Random(seed)
+    vocabulary = sorted({word for _, title, _, _ in base for word in title.split()})
+    authors = sorted({author for _, _, author, _ in base})
+
+    for k in range(1, copies + 1):
+        for isbn, title, _, year in base:
+            words = title.split() or [title]
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+            yield (
+                f"{SYNTHETIC_PREFIX}{k:04d}{isbn}",
+                " ".join(words),
+                rng.choice(authors),
+                year + rng.randint(-5, 5),
+            )
+
+
+def copy_rows(engine, table, columns, rows):
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        count = 0
+
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+            if count % CHUNK_ROWS == 0:
+                buf.seek(0)
+                cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+
+        buf.seek(0)
+        cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+        conn.commit()
+        return count
+    finally:
+        conn.close()
+
+
+def clear_synthetic(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM books WHERE isbn LIKE :p"), {"p": f"{SYNTHETIC_PREFIX}%"})
+
+
+def seed_catalogue(engine, scale, path=BOOKS_CSV, seed=551):
+    # Grow the books table to `scale` times the size of books.csv. The real
+    # rows are expected to be loaded already (python import.py).
+    base = read_books(path)
+    clear_synthetic(engine)
+    count = copy_rows(
+        engine, "books", ("isbn", "title", "author", "year"),
+        generate_books(base, scale - 1, seed=seed)
+    )
+    # VACUUM also flushes the GIN pending lists, which would otherwise make
+    # the first searches after a bulk load look much slower than steady state.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE books"))
+    return base, count
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+from review_stats import STATS_COLUMNS
+
+REVIEWS_PAGE_SIZE = 20
+
+# Book row, review aggregates and one page of reviews in a single round trip.
+# The lateral subquery walks idx_reviews_isbn_created from the newest review
+# (or from the cursor) and stops after :limit rows, so the cost does not grow
+# with the number of reviews. A book with no reviews still comes back as one
+# row with NULL review columns.
+BOOK_PAGE_SQL = """
+SELECT b.isbn, b.title, b.author, b.year, {stats},
+       r.id AS review_id, r.username, r.rating, r.review_text, r.created_at
+FROM books b
+LEFT JOIN book_stats s ON s.isbn = b.isbn
+LEFT JOIN LATERAL (
+    SELECT r.id, u.username, r.rating, r.review_text, r.created_at
+    FROM reviews r JOIN users u ON u.id = r.user_id
+    WHERE r.isbn = b.isbn {before}
+    ORDER BY r.created_at DESC, r.id DESC
+    LIMIT :limit
+) r ON TRUE
+WHERE b.isbn = :isbn
+ORDER BY r.created_at DESC, r.id DESC
+"""
+
+BEFORE_SQL = "AND (r.created_at, r.id) < (:before_at, :before_id)"
+
+
+def encode_cursor(review):
+    return f"{review.created_at.isoformat()}_{review.review_id}"
+
+
+def decode_cursor(cursor):
+    created_at, _, review_id = (cursor or "").rpartition("_")
+    try:
+        return datetime.fromisoformat(created_at), int(review_id)
+    except ValueError:
+        return None
+
+
+def load_book(db, isbn, before=None, limit=REVIEWS_PAGE_SIZE):
+    # Returns (book, reviews, next_cursor). `book` carries the STATS_COLUMNS
+    # aggregates; it is None when the ISBN is unknown.
+    params = {"isbn": isbn, "limit": limit + 1}
+
+    position = decode_cursor(before)
+    if position:
+        params["before_at"], params["before_id"] = position
+
+    rows = db.execute(
+        text(BOOK_PAGE_SQL.format(stats=STATS_COLUMNS, before=BEFORE_SQL if position else "")),
+        params
+    ).fetchall()
+
+    if not rows:
+        return None, [], None
+
+    reviews = [row for row in rows if row.review_id is not None]
+    next_cursor = encode_cursor(reviews[limit - 1]) if len(reviews) > limit else None
+    return rows[0], reviews[:limit], next_cursor
@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+
+from sqlalchemy import text
+
+EXPORT_BATCH_SIZE = 5000
+
+EXPORT_COLUMNS = ("isbn", "title", "author", "year", "review_count", "average_rating")
+
+# average_rating is NULL for books nobody has reviewed.
+EXPORT_SQL = """
+SELECT b.isbn, b.title, b.author, b.year,
+       COALESCE(s.rating_count, 0) AS review_count,
+       ROUND(s.rating_sum::numeric / NULLIF(s.rating_count, 0), 2)::float AS average_rating
+FROM books b
+LEFT JOIN book_stats s ON s.isbn = b.isbn
+ORDER BY b.isbn
+"""
+
+
+def export_batches(engine, batch_size=EXPORT_BATCH_SIZE):
+    # stream_results reads through a server-side cursor, so only one batch
+    # of rows is in memory at a time however large the catalogue is. The
+    # whole export runs in one transaction and sees one consistent snapshot.
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=batch_size).execute(
+            text(EXPORT_SQL)
+        )
+        for batch in result.partitions(batch_size):
+            yield batch
+
+
+def ndjson_chunks(batches):
+    for batch in batches:
+        yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in batch)
+
+
+def csv_chunks(batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_chunks, "application/x-ndjson"),
+    "csv": (csv_chunks, "text/csv"),
+}
@@ -0,0 +1,202 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+
+class MetadataCache:
+    """Two-tier cache for per-ISBN upstream metadata.
+
+    Lookups go to a bounded in-process LRU first, then to the shared
+    book_metadata table, and only then to the upstream fetch function.
+    "Not found" answers (fetch returned None) are cached too, for a shorter
+    TTL. Concurrent lookups for the same ISBN share a single upstream call.
+    If the upstream call raises, the last known value is served even if it
+    has expired, and nothing new is cached.
+    """
+
+    def __init__(self, engine, maxsize=2048, ttl=7 * 24 * 3600, negative_ttl=6 * 3600):
+        self.engine = engine
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "store_hits": 0,
+            "upstream_calls": 0,
+            "upstream_errors": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "stale_served": 0,
+            "store_errors": 0,
+        }
+
+    def get(self, isbn, fetch):
+        with self._lock:
+            entry = self._entries.get(isbn)
+            if entry and entry[1] > time.monotonic():
+                self._entries.move_to_end(isbn)
+                self.counters["negative_hits" if entry[0] is None else "hits"] += 1
+                return entry[0]
+
+            self.counters["misses"] += 1
+            pending = self._inflight.get(isbn)
+            if pending:
+                self.counters["coalesced"] += 1
+                leader = False
+            else:
+                pending = self._inflight[isbn] = Future()
+                leader = True
+
+        if not leader:
+            return pending.result()
+
+        try:
+            value = self._load(isbn, fetch, stale=entry[0] if entry else None)
+        except BaseException as exc:
+            pending.set_exception(exc)
+            raise
+        else:
+            pending.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(isbn, None)
+
+    def refresh(self, isbn, fetch):
+        # Always goes upstream; used by background warmers to replace
+        # entries before they expire.
+        return self._fetch(isbn, fetch, stale=None)
+
+    def get_many(self, isbns):
+        # Fresh entries only, from the LRU or a single store query; nothing
+        # goes upstream. ISBNs missing from the result need get().
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for isbn in isbns:
+                entry = self._entries.get(isbn)
+                if entry and entry[1] > now:
+                    self._entries.move_to_end(isbn)
+                    self.counters["negative_hits" if entry[0] is None else "hits"] += 1
+                    found[isbn] = entry[0]
+
+        rest = [isbn for isbn in isbns if isbn not in found]
+        for isbn, (value, remaining) in self._read_store_many(rest).items():
+            if remaining > 0:
+                with self._lock:
+                    self.counters["store_hits"] += 1
+                self._remember(isbn, value, remaining)
+                found[isbn] = value
+        return found
+
+    def invalidate(self, isbn):
+        with self._lock:
+            self._entries.pop(isbn, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, size=len(self._entries), maxsize=self.maxsize)
+
+    def _load(self, isbn, fetch, stale):
+        stored = self._read_store(isbn)
+        if stored:
+            value, remaining = stored
+            if remaining > 0:
+                with self._lock:
+                    self.counters["store_hits"] += 1
+                self._remember(isbn, value, remaining)
+                return value
+            stale = value if value is not None else stale
+
+        return self._fetch(isbn, fetch, stale)
+
+    def _fetch(self, isbn, fetch, stale):
+        with self._lock:
+            self.counters["upstream_calls"] += 1
+
+        try:
+            value = fetch(isbn)
+        except Exception:
+            with self._lock:
+                self.counters["upstream_errors"] += 1
+                if stale is not None:
+                    self.counters["stale_served"] += 1
+            return stale
+
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self._write_store(isbn, value, ttl)
+        self._remember(isbn, value, ttl)
+        return value
+
+    def _remember(self, isbn, value, ttl):
+        with self._lock:
+            self._entries[isbn] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(isbn)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def _read_store(self, isbn):
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(
+                    text(
+                        "SELECT data, EXTRACT(EPOCH FROM expires_at - NOW()) AS remaining "
+                        "FROM book_metadata WHERE isbn = :isbn"
+                    ),
+                    {"isbn": isbn}
+                ).fetchone()
+        except SQLAlchemyError:
+            with self._lock:
+                self.counters["store_errors"] += 1
+            return None
+
+        if not row:
+            return None
+        return row.data, float(row.remaining)
+
+    def _read_store_many(self, isbns):
+        if not isbns:
+            return {}
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    text(
+                        "SELECT isbn, data, EXTRACT(EPOCH FROM expires_at - NOW()) AS remaining "
+                        "FROM book_metadata WHERE isbn = ANY(:isbns)"
+                    ),
+                    {"isbns": isbns}
+                ).fetchall()
+        except SQLAlchemyError:
+            with self._lock:
+                self.counters["store_errors"] += 1
+            return {}
+
+        return {row.isbn: (row.data, float(row.remaining)) for row in rows}
+
+    def _write_store(self, isbn, value, ttl):
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    text(
+                        "INSERT INTO book_metadata (isbn, data, fetched_at, expires_at) "
+                        "VALUES (:isbn, CAST(:data AS JSONB), NOW(), NOW() + make_interval(secs => :ttl)) "
+                        "ON CONFLICT (isbn) DO UPDATE SET data = EXCLUDED.data, "
+                        "fetched_at = EXCLUDED.fetched_at, expires_at = EXCLUDED.expires_at"
+                    ),
+                    {"isbn": isbn, "data": json.dumps(value) if value is not None else None, "ttl": ttl}
+                )
+        except SQLAlchemyError:
+            with self._lock:
+                self.counters["store_errors"] += 1
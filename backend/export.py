@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import argparse
+
+from sqlalchemy import create_engine
+
+from book_export import EXPORT_BATCH_SIZE, EXPORT_FORMATS, export_batches
+
+if not os.getenv("DATABASE_URL"):
+    raise RuntimeError("DATABASE_URL is not set")
+
+engine = create_engine(os.getenv("DATABASE_URL"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export every book with its review count and average rating")
+    parser.add_argument("output", nargs="?", help="file to write (default: stdout)")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    to_chunks, _ = EXPORT_FORMATS[args.format]
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    rows = 0
+    started = time.perf_counter()
+
+    def counted(batches):
+        nonlocal rows
+        for batch in batches:
+            rows += len(batch)
+            yield batch
+
+    try:
+        for chunk in to_chunks(counted(export_batches(engine, args.batch_size))):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+    print(f"Exported {rows} books in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,193 @@
 import os
 import csv
+import io
+import json
+import time
+import argparse
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import create_engine
 
 if not os.getenv("DATABASE_URL"):
     raise RuntimeError("DATABASE_URL is not set")
 
 engine = create_engine(os.getenv("DATABASE_URL"))
-db = scoped_session(sessionmaker(bind=engine))
 
-def main():
-    with open("books.csv", newline="", encoding="utf-8") as f:
+CHUNK_SIZE = 10000
+
+# Rows are COPY'd into a per-session staging table and merged into books with
+# one statement per chunk. ON COMMIT DELETE ROWS empties it after every chunk.
+STAGING_SQL = (
+    "CREATE TEMP TABLE IF NOT EXISTS books_staging ("
+    "line BIGINT, isbn VARCHAR(20), title TEXT, author TEXT, year INT"
+    ") ON COMMIT DELETE ROWS"
+)
+
+# When the same ISBN appears twice in a chunk the later line wins, matching
+# what a row-by-row upsert would have left behind.
+MERGE_SQL = (
+    "INSERT INTO books (isbn, title, author, year) "
+    "SELECT DISTINCT ON (isbn) isbn, title, author, year FROM books_staging "
+    "ORDER BY isbn, line DESC "
+    "ON CONFLICT (isbn) DO UPDATE SET "
+    "title = EXCLUDED.title, author = EXCLUDED.author, year = EXCLUDED.year, updated_at = NOW() "
+    "WHERE (books.title, books.author, books.year) "
+    "IS DISTINCT FROM (EXCLUDED.title, EXCLUDED.author, EXCLUDED.year)"
+)
+
+# Secondary indexes on books, as defined in database/schema.sql. With
+# --defer-indexes they are dropped for the load and rebuilt once at the end.
+BOOK_INDEXES = {
+    "idx_books_isbn_trgm": "CREATE INDEX IF NOT EXISTS idx_books_isbn_trgm ON books USING gin (isbn gin_trgm_ops)",
+    "idx_books_title_trgm": "CREATE INDEX IF NOT EXISTS idx_books_title_trgm ON books USING gin (title gin_trgm_ops)",
+    "idx_books_author_trgm": "CREATE INDEX IF NOT EXISTS idx_books_author_trgm ON books USING gin (author gin_trgm_ops)",
+    "idx_books_updated_at": "CREATE INDEX IF NOT EXISTS idx_books_updated_at ON books(updated_at)",
+}
+
+
+def normalize(row):
+    isbn = (row.get("isbn") or "").strip()
+    title = (row.get("title") or "").strip()
+    author = (row.get("author") or "").strip()
+
+    try:
+        year = int((row.get("year") or "").strip())
+    except ValueError:
+        return None
+
+    if not isbn or len(isbn) > 20 or not title or not author:
+        return None
+
+    return isbn, title, author, year
+
+
+def read_checkpoint(path, source):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    # Resuming a different file would silently skip its first rows.
+    if os.path.abspath(state.get("file", "")) != os.path.abspath(source):
+        raise RuntimeError(f"{path} records progress for {state.get('file')}, not {source}; "
+                           f"remove it to start over")
+    return state.get("rows", 0)
+
+
+def write_checkpoint(path, source, rows):
+    if not path:
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"file": os.path.abspath(source), "rows": rows}, f)
+    os.replace(tmp, path)
+
+
+def read_chunks(path, chunk_size, skip):
+    # Yields (lines_read, [(line, isbn, title, author, year), ...], rejected)
+    # so the caller can checkpoint on raw line counts, not accepted rows.
+    with open(path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
+        chunk = []
+        rejected = []
+        line = 0
+
         for row in reader:
-            db.execute(
-                text(
-                    "INSERT INTO books (isbn, title, author, year) "
-                    "VALUES (:isbn, :title, :author, :year) "
-                    "ON CONFLICT (isbn) DO NOTHING"
-                ),
-                {
-                    "isbn": row["isbn"].strip(),
-                    "title": row["title"].strip(),
-                    "author": row["author"].strip(),
-                    "year": int(row["year"])
-                }
-            )
-    db.commit()
-    print("Import complete")
+            line += 1
+            if line <= skip:
+                continue
+
+            values = normalize(row)
+            if values is None:
+                rejected.append(line)
+            else:
+                chunk.append((line,) + values)
+
+            if len(chunk) + len(rejected) >= chunk_size:
+                yield line, chunk, rejected
+                chunk = []
+                rejected = []
+
+        if chunk or rejected:
+            yield line, chunk, rejected
+
+
+def copy_chunk(cur, chunk):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(chunk)
+    buf.seek(0)
+    cur.copy_expert(
+        "COPY books_staging (line, isbn, title, author, year) FROM STDIN WITH (FORMAT csv)",
+        buf
+    )
+
+
+def load(path, chunk_size=CHUNK_SIZE, checkpoint=None, defer_indexes=False):
+    skip = read_checkpoint(checkpoint, path)
+    if skip:
+        print(f"Resuming after line {skip}")
+
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(STAGING_SQL)
+
+        if defer_indexes:
+            for name in BOOK_INDEXES:
+                cur.execute(f"DROP INDEX IF EXISTS {name}")
+        conn.commit()
+
+        started = time.perf_counter()
+        loaded = 0
+        rejected_total = 0
+
+        for line, chunk, rejected in read_chunks(path, chunk_size, skip):
+            if chunk:
+                copy_chunk(cur, chunk)
+                cur.execute(MERGE_SQL)
+            conn.commit()
+            write_checkpoint(checkpoint, path, line)
+
+            loaded += len(chunk)
+            rejected_total += len(rejected)
+            if rejected:
+                print(f"  skipped invalid line(s): {', '.join(str(n) for n in rejected[:10])}"
+                      + (" ..." if len(rejected) > 10 else ""))
+
+            elapsed = time.perf_counter() - started
+            print(f"line {line}: {loaded} rows loaded, {rejected_total} rejected "
+                  f"({loaded / elapsed:.0f} rows/s)")
+
+        if defer_indexes:
+            print("Building indexes")
+            for ddl in BOOK_INDEXES.values():
+                cur.execute(ddl)
+        cur.execute("ANALYZE books")
+        conn.commit()
+    finally:
+        conn.close()
+
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    elapsed = time.perf_counter() - started
+    return loaded, rejected_total, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a books CSV into the books table")
+    parser.add_argument("file", nargs="?", default="books.csv")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--checkpoint", help="file recording progress; an interrupted load resumes from it")
+    parser.add_argument("--defer-indexes", action="store_true",
+                        help="drop secondary indexes during the load and rebuild them at the end")
+    args = parser.parse_args()
+
+    loaded, rejected, elapsed = load(
+        args.file,
+        chunk_size=args.chunk_size,
+        checkpoint=args.checkpoint,
+        defer_indexes=args.defer_indexes
+    )
+    print(f"Import complete: {loaded} rows in {elapsed:.1f}s, {rejected} rejected")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,62 @@
+import os
+import csv
+import sys
+import time
+import argparse
+
+from sqlalchemy import create_engine
+
+from review_ingest import INGEST_CHUNK_SIZE, INGEST_FIELDS, ingest_reviews, read_csv_records, read_ndjson_records
+
+if not os.getenv("DATABASE_URL"):
+    raise RuntimeError("DATABASE_URL is not set")
+
+engine = create_engine(os.getenv("DATABASE_URL"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load reviews exported from another system")
+    parser.add_argument("file", help="CSV with a username,isbn,rating,review_text[,created_at] header, "
+                                     "or NDJSON with the same keys; - reads stdin")
+    parser.add_argument("--format", choices=("csv", "ndjson"),
+                        help="input format (default: from the file extension, else csv)")
+    parser.add_argument("--rejects", default="reviews_rejected.csv",
+                        help="where to write rows that were not loaded, with the reason")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE)
+    parser.add_argument("--create-users", action="store_true",
+                        help="create accounts (without a usable password) for unknown usernames")
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.file.endswith((".ndjson", ".jsonl")) else "csv")
+    source = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8")
+    reader = read_ndjson_records if fmt == "ndjson" else read_csv_records
+
+    started = time.perf_counter()
+
+    def progress(counts):
+        done = counts["loaded"] + counts["rejected"]
+        print(f"{counts['loaded']} loaded, {counts['rejected']} rejected "
+              f"({done / (time.perf_counter() - started):.0f} rows/s)")
+
+    with open(args.rejects, "w", newline="", encoding="utf-8") as rejects_file:
+        rejects = csv.writer(rejects_file)
+        rejects.writerow(("line", "reason") + INGEST_FIELDS)
+
+        def on_reject(line, reason, record):
+            record = record or {}
+            rejects.writerow((line, reason) + tuple(record.get(field) for field in INGEST_FIELDS))
+
+        try:
+            counts = ingest_reviews(
+                engine, reader(source), on_reject=on_reject, chunk_size=args.chunk_size,
+                create_users=args.create_users, on_progress=progress
+            )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+    print(f"Done in {time.perf_counter() - started:.1f}s: {counts['loaded']} reviews loaded, "
+          f"{counts['rejected']} rejected" + (f" (see {args.rejects})" if counts["rejected"] else ""))
+
+if __name__ == "__main__":
+    main()
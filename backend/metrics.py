@@ -0,0 +1,338 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import before_render_template, request, template_rendered
+from sqlalchemy import event
+from werkzeug.wsgi import ClosingIterator
+
+# Request latency buckets, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Requests slower than this (milliseconds) are logged with their slowest SQL
+# statements. 0 turns the log off.
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+SLOW_SQL_LOGGED = 3
+
+logger = logging.getLogger("slow_requests")
+
+_timings = ContextVar("request_timings", default=None)
+_section = ContextVar("timing_section", default=None)
+
+
+class RequestTimings:
+    """Time spent per phase (db, session, template, upstream name) in one request.
+
+    Enrichment work started from the request can record into the same
+    object from pool threads, hence the lock.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.route = None
+        self.phases = {}
+        self.statements = []
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self._lock:
+            total, count = self.phases.get(phase, (0.0, 0))
+            self.phases[phase] = (total + seconds, count + 1)
+
+    def add_statement(self, seconds, statement):
+        with self._lock:
+            self.statements.append((seconds, statement))
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.phases)
+
+    def server_timing(self):
+        parts = [
+            f'{phase};dur={total * 1000:.1f};desc="{count} call{"s" if count != 1 else ""}"'
+            for phase, (total, count) in sorted(self.snapshot().items())
+        ]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, seconds):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(b), s, c) for labels, (b, s, c) in self._series.items()}
+
+        for labels, (buckets, total, count) in sorted(series.items()):
+            lines.extend(histogram_lines(self.name, zip(self.label_names, labels), self.buckets, buckets, total, count))
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route.",
+    ("route", "method", "status")
+)
+PHASE_DURATION = Histogram(
+    "http_request_phase_seconds",
+    "Time a request spent in each phase (db, session, template, upstream), by route.",
+    ("route", "phase")
+)
+
+
+def format_labels(pairs):
+    escaped = ((name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for name, value in pairs)
+    return ",".join(f'{name}="{value}"' for name, value in escaped)
+
+
+def histogram_lines(name, labels, bounds, buckets, total, count):
+    # `buckets` holds per-bucket (non-cumulative) counts.
+    base = format_labels(labels)
+    lines = []
+    cumulative = 0
+    for bound, n in zip(bounds, buckets):
+        cumulative += n
+        lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{base},le="+Inf"}} {count}')
+    lines.append(f"{name}_sum{{{base}}} {total}")
+    lines.append(f"{name}_count{{{base}}} {count}")
+    return lines
+
+
+def record(phase, seconds):
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+
+@contextmanager
+def timed(phase):
+    # SQL run inside a timed section counts towards that section only.
+    token = _section.set(phase)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _section.reset(token)
+        record(phase, time.perf_counter() - start)
+
+
+class TimingMiddleware:
+    """Starts the per-request timings before Flask opens the session.
+
+    The request is finished when the server closes the response, so
+    streamed bodies are timed in full, and their SQL counts towards it too.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        timings = RequestTimings()
+        status = []
+
+        def capture(code, headers, exc_info=None):
+            status.append(code.split(" ", 1)[0])
+            return start_response(code, headers, exc_info)
+
+        def done():
+            finish(timings, environ.get("REQUEST_METHOD", ""), status[0] if status else "500")
+
+        try:
+            body = self.in_request(timings, self.wsgi_app, environ, capture)
+        except BaseException:
+            done()
+            raise
+
+        def close():
+            try:
+                if hasattr(body, "close"):
+                    self.in_request(timings, body.close)
+            finally:
+                done()
+
+        return ClosingIterator(self.stream(timings, body), close)
+
+    def stream(self, timings, body):
+        iterator = iter(body)
+        while True:
+            try:
+                chunk = self.in_request(timings, next, iterator)
+            except StopIteration:
+                return
+            yield chunk
+
+    @staticmethod
+    def in_request(timings, fn, *args):
+        token = _timings.set(timings)
+        section_token = _section.set(None)
+        try:
+            return fn(*args)
+        finally:
+            _timings.reset(token)
+            _section.reset(section_token)
+
+
+def finish(timings, method, status):
+    route = timings.route or "unmatched"
+    total = timings.elapsed()
+
+    REQUEST_DURATION.observe((route, method, status), total)
+    for phase, (seconds, _) in timings.snapshot().items():
+        PHASE_DURATION.observe((route, phase), seconds)
+
+    if SLOW_REQUEST_MS and total * 1000 >= SLOW_REQUEST_MS:
+        slowest = sorted(timings.statements, key=lambda s: s[0], reverse=True)[:SLOW_SQL_LOGGED]
+        logger.warning(
+            "slow request: %s %s %s %.1fms [%s]%s",
+            method, route, status, total * 1000, timings.server_timing(),
+            "".join(f"\n  {seconds * 1000:.1f}ms {' '.join(sql.split())}" for seconds, sql in slowest)
+        )
+
+
+class TimedSessionInterface:
+    """Wraps an app's session interface to time session load and save.
+
+    Flask's default cookie interface is one instance shared by every app in
+    the process, so it is wrapped per app rather than patched in place.
+    """
+
+    def __init__(self, interface):
+        self.interface = interface
+
+    def __getattr__(self, name):
+        return getattr(self.interface, name)
+
+    def open_session(self, *args):
+        with timed("session"):
+            return self.interface.open_session(*args)
+
+    def save_session(self, *args):
+        with timed("session"):
+            return self.interface.save_session(*args)
+
+
+def instrument(app, engine):
+    # Times every SQL statement, session load/save and template render, and
+    # reports them in a Server-Timing header and the /metrics histograms.
+    # Upstream clients record their own calls through record().
+    app.wsgi_app = TimingMiddleware(app.wsgi_app)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_start"].pop()
+        timings = _timings.get()
+        if timings is None:
+            return
+        if _section.get() is None:
+            timings.add("db", seconds)
+        if SLOW_REQUEST_MS:
+            timings.add_statement(seconds, statement)
+
+    if not isinstance(app.session_interface, TimedSessionInterface):
+        app.session_interface = TimedSessionInterface(app.session_interface)
+
+    def render_started(sender, template, context, **extra):
+        context["_render_timer"] = (_section.set("template"), time.perf_counter())
+
+    def render_finished(sender, template, context, **extra):
+        token, start = context.pop("_render_timer", (None, None))
+        if token is not None:
+            _section.reset(token)
+            record("template", time.perf_counter() - start)
+
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+
+    @app.before_request
+    def remember_route():
+        timings = _timings.get()
+        if timings is not None:
+            timings.route = request.url_rule.rule if request.url_rule else "unmatched"
+
+    @app.after_request
+    def add_server_timing(response):
+        timings = _timings.get()
+        if timings is not None:
+            response.headers["Server-Timing"] = timings.server_timing()
+        return response
+
+
+def render(extra_lines=()):
+    lines = REQUEST_DURATION.render() + PHASE_DURATION.render()
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
+
+
+def counter_lines(name, help_text, label, values):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    lines.extend(f"{name}{{{format_labels([(label, key)])}}} {value}" for key, value in sorted(values.items()))
+    return lines
+
+
+def cache_lines(name, help_text, stats):
+    # Cache stats() dicts: event counters plus current size and maxsize.
+    stats = dict(stats)
+    size, maxsize = stats.pop("size"), stats.pop("maxsize")
+    return counter_lines(f"{name}_events_total", help_text, "event", stats) + [
+        f"# TYPE {name}_entries gauge", f"{name}_entries {size}",
+        f"# TYPE {name}_max_entries gauge", f"{name}_max_entries {maxsize}",
+    ]
+
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def upstream_lines(clients):
+    stats = {client.name: client.stats() for client in clients}
+    lines = ["# HELP upstream_request_duration_seconds Latency of each upstream HTTP attempt.",
+             "# TYPE upstream_request_duration_seconds histogram"]
+    for name, s in sorted(stats.items()):
+        bounds = list(s["latency_buckets"])
+        lines.extend(histogram_lines(
+            "upstream_request_duration_seconds", [("upstream", name)], bounds,
+            [s["latency_buckets"][b] for b in bounds], s["latency_sum"], s["attempts"]
+        ))
+
+    for event_name in ("calls", "retries", "errors", "short_circuits", "circuit_opened"):
+        lines.extend(counter_lines(
+            f"upstream_{event_name}_total", f"Upstream {event_name.replace('_', ' ')}.", "upstream",
+            {name: s[event_name] for name, s in stats.items()}
+        ))
+
+    lines.append("# HELP upstream_circuit_state 0 = closed, 1 = half open, 2 = open.")
+    lines.append("# TYPE upstream_circuit_state gauge")
+    lines.extend(
+        f'upstream_circuit_state{{{format_labels([("upstream", name)])}}} {CIRCUIT_STATES[s["state"]]}'
+        for name, s in sorted(stats.items())
+    )
+    return lines
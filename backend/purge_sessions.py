@@ -0,0 +1,27 @@
+import os
+import time
+import argparse
+
+from sqlalchemy import create_engine
+
+from sessions import purge_expired_sessions
+
+if not os.getenv("DATABASE_URL"):
+    raise RuntimeError("DATABASE_URL is not set")
+
+engine = create_engine(os.getenv("DATABASE_URL"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete expired rows from the sessions table")
+    parser.add_argument("--every", type=int, help="keep running, purging every N seconds")
+    args = parser.parse_args()
+
+    while True:
+        print(f"Purged {purge_expired_sessions(engine)} expired session(s)")
+        if not args.every:
+            return
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
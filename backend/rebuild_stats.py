@@ -0,0 +1,23 @@
+import os
+import argparse
+
+from sqlalchemy import create_engine
+
+from review_stats import rebuild
+
+if not os.getenv("DATABASE_URL"):
+    raise RuntimeError("DATABASE_URL is not set")
+
+engine = create_engine(os.getenv("DATABASE_URL"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute book_stats from the reviews table")
+    parser.add_argument("--isbn", help="only rebuild this book")
+    args = parser.parse_args()
+
+    count = rebuild(engine, isbn=args.isbn)
+    print(f"Rebuilt stats for {count} book(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+class ResponseCache:
+    """Bounded in-process cache of rendered response bodies.
+
+    Entries carry a strong ETag (SHA-256 of the body) and the time they
+    were generated, for Last-Modified. maxsize=0 disables caching.
+    """
+
+    def __init__(self, maxsize=4096, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["expires"] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return entry
+
+            self.counters["misses"] += 1
+            return None
+
+    def build(self, body):
+        return {
+            "body": body,
+            "etag": hashlib.sha256(body).hexdigest(),
+            "last_modified": datetime.now(timezone.utc).replace(microsecond=0),
+            "expires": time.monotonic() + self.ttl,
+        }
+
+    def put(self, key, entry):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, size=len(self._entries), maxsize=self.maxsize)
@@ -0,0 +1,193 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+INGEST_CHUNK_SIZE = 10000
+
+INGEST_FIELDS = ("username", "isbn", "rating", "review_text", "created_at")
+
+# Raw values go into a per-session staging table as text; every check below
+# then runs once per chunk as a set operation instead of once per row.
+STAGING_SQL = (
+    "CREATE TEMP TABLE IF NOT EXISTS reviews_staging ("
+    "line BIGINT, username TEXT, isbn TEXT, rating TEXT, review_text TEXT, created_at TIMESTAMP, "
+    "user_id INT, reason TEXT"
+    ") ON COMMIT DELETE ROWS"
+)
+
+# Run before any accounts are created, so one bad value is rejected rather
+# than failing the chunk. The length is users.username's VARCHAR(64).
+USERNAME_CHECK_SQL = "UPDATE reviews_staging SET reason = 'bad username' WHERE length(username) > 64"
+
+# Accounts for usernames that do not exist yet (--create-users). The "!"
+# hash never matches a password, so they cannot log in until reset.
+CREATE_USERS_SQL = (
+    "INSERT INTO users (username, password_hash) "
+    "SELECT DISTINCT username, '!' FROM reviews_staging WHERE reason IS NULL AND username <> '' "
+    "ON CONFLICT (username) DO NOTHING"
+)
+
+# Applied in order; a row keeps the first reason it is rejected for.
+CHECKS = (
+    "UPDATE reviews_staging st SET user_id = u.id FROM users u WHERE u.username = st.username",
+    "UPDATE reviews_staging SET reason = 'unknown user' WHERE reason IS NULL AND user_id IS NULL",
+    "UPDATE reviews_staging st SET reason = 'unknown book' WHERE reason IS NULL "
+    "AND NOT EXISTS (SELECT 1 FROM books b WHERE b.isbn = st.isbn)",
+    # The same rule as the reviews.rating CHECK constraint.
+    "UPDATE reviews_staging SET reason = 'rating must be 1-5' WHERE reason IS NULL AND COALESCE(rating, '') !~ '^[1-5]$'",
+    "UPDATE reviews_staging SET reason = 'empty review' WHERE reason IS NULL AND COALESCE(review_text, '') = ''",
+    # UNIQUE (user_id, isbn) within the input: the first line wins.
+    "UPDATE reviews_staging st SET reason = 'duplicate in input' FROM ("
+    "SELECT line, ROW_NUMBER() OVER (PARTITION BY user_id, isbn ORDER BY line) AS n "
+    "FROM reviews_staging WHERE reason IS NULL"
+    ") d WHERE d.line = st.line AND d.n > 1",
+)
+
+# UNIQUE (user_id, isbn) against reviews already stored, including ones
+# written concurrently: rows the INSERT skips are marked afterwards. The
+# statement-level triggers on reviews update book_stats once per chunk.
+INSERT_SQL = """
+WITH inserted AS (
+    INSERT INTO reviews (user_id, isbn, rating, review_text, created_at)
+    SELECT user_id, isbn, rating::int, review_text, COALESCE(created_at, NOW())
+    FROM reviews_staging
+    WHERE reason IS NULL
+    ORDER BY line
+    ON CONFLICT (user_id, isbn) DO NOTHING
+    RETURNING user_id, isbn
+)
+UPDATE reviews_staging st SET reason = 'already reviewed'
+WHERE st.reason IS NULL
+  AND NOT EXISTS (SELECT 1 FROM inserted i WHERE i.user_id = st.user_id AND i.isbn = st.isbn)
+"""
+
+REJECTS_SQL = (
+    "SELECT line, reason, username, isbn, rating, review_text, created_at "
+    "FROM reviews_staging WHERE reason IS NOT NULL ORDER BY line"
+)
+
+
+def parse_created_at(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    # created_at is stored without a zone; offsets are converted to UTC.
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def read_csv_records(f):
+    # Yields (line, record) with line numbers counted from the header.
+    for line, row in enumerate(csv.DictReader(f), start=2):
+        yield line, row
+
+
+def read_ndjson_records(f):
+    for line, raw in enumerate(f, start=1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            record = None
+        yield line, record if isinstance(record, dict) else None
+
+
+def prepare(line, record):
+    # Returns (staging row, None) or (None, reason) for rows that cannot
+    # even be staged. Everything else is checked in SQL.
+    if record is None:
+        return None, "malformed record"
+
+    values = {field: record.get(field) for field in INGEST_FIELDS}
+    # PostgreSQL text cannot hold NUL, and one would fail the whole COPY.
+    if any("\x00" in str(value) for value in values.values() if value is not None):
+        return None, "invalid character"
+
+    try:
+        created_at = parse_created_at(str(values["created_at"] or ""))
+    except ValueError:
+        return None, "bad created_at"
+
+    return (
+        line,
+        str(values["username"] or "").strip(),
+        str(values["isbn"] or "").strip(),
+        str(values["rating"] if values["rating"] is not None else "").strip(),
+        str(values["review_text"] or "").strip(),
+        created_at.isoformat(sep=" ") if created_at else None,
+    ), None
+
+
+def copy_chunk(cur, chunk):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(chunk)
+    buf.seek(0)
+    cur.copy_expert(
+        "COPY reviews_staging (line, username, isbn, rating, review_text, created_at) "
+        "FROM STDIN WITH (FORMAT csv)",
+        buf
+    )
+
+
+def ingest_reviews(engine, records, on_reject=None, chunk_size=INGEST_CHUNK_SIZE,
+                   create_users=False, on_progress=None):
+    """Load (line, record) pairs into reviews, one transaction per chunk.
+
+    on_reject(line, reason, record) is called for every row not loaded;
+    on_progress(counts) after every committed chunk. Re-running the same
+    input is safe: rows already loaded are rejected as "already reviewed".
+    """
+    counts = {"loaded": 0, "rejected": 0}
+
+    def reject(line, reason, record):
+        counts["rejected"] += 1
+        if on_reject:
+            on_reject(line, reason, record)
+
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(STAGING_SQL)
+        conn.commit()
+
+        def flush(chunk):
+            copy_chunk(cur, chunk)
+            cur.execute(USERNAME_CHECK_SQL)
+            if create_users:
+                cur.execute(CREATE_USERS_SQL)
+            for sql in CHECKS:
+                cur.execute(sql)
+            cur.execute(INSERT_SQL)
+            cur.execute(REJECTS_SQL)
+            rejected = cur.fetchall()
+            conn.commit()
+
+            for line, reason, username, isbn, rating, review_text, created_at in rejected:
+                reject(line, reason, {
+                    "username": username, "isbn": isbn, "rating": rating,
+                    "review_text": review_text, "created_at": created_at.isoformat() if created_at else None,
+                })
+            counts["loaded"] += len(chunk) - len(rejected)
+            if on_progress:
+                on_progress(counts)
+
+        chunk = []
+        for line, record in records:
+            row, reason = prepare(line, record)
+            if reason:
+                reject(line, reason, record)
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+    finally:
+        conn.close()
+
+    return counts
@@ -0,0 +1,43 @@
+from sqlalchemy import text
+
+# Columns to select from a `LEFT JOIN book_stats s` so books without reviews
+# come back as zeros.
+STATS_COLUMNS = (
+    "COALESCE(s.rating_count, 0) AS rating_count, "
+    "COALESCE(s.rating_sum, 0) AS rating_sum, "
+    "COALESCE(s.rating_sum::float / NULLIF(s.rating_count, 0), 0) AS rating_avg, "
+    "COALESCE(s.rating_1, 0) AS rating_1, "
+    "COALESCE(s.rating_2, 0) AS rating_2, "
+    "COALESCE(s.rating_3, 0) AS rating_3, "
+    "COALESCE(s.rating_4, 0) AS rating_4, "
+    "COALESCE(s.rating_5, 0) AS rating_5"
+)
+
+REBUILD_SQL = """
+INSERT INTO book_stats (isbn, rating_count, rating_sum, rating_1, rating_2, rating_3, rating_4, rating_5)
+SELECT isbn, COUNT(*), SUM(rating),
+       COUNT(*) FILTER (WHERE rating = 1),
+       COUNT(*) FILTER (WHERE rating = 2),
+       COUNT(*) FILTER (WHERE rating = 3),
+       COUNT(*) FILTER (WHERE rating = 4),
+       COUNT(*) FILTER (WHERE rating = 5)
+FROM reviews {where}
+GROUP BY isbn
+"""
+
+
+def histogram(row):
+    return {str(n): getattr(row, f"rating_{n}") for n in range(1, 6)}
+
+
+def rebuild(engine, isbn=None):
+    # Recomputes the aggregates from reviews. Review writes are blocked for
+    # the duration so no trigger update can slip in between the delete and
+    # the re-insert.
+    params = {"isbn": isbn} if isbn else {}
+    where = "WHERE isbn = :isbn" if isbn else ""
+
+    with engine.begin() as conn:
+        conn.execute(text("LOCK TABLE reviews IN SHARE MODE"))
+        conn.execute(text(f"DELETE FROM book_stats {where}"), params)
+        return conn.execute(text(REBUILD_SQL.format(where=where)), params).rowcount
@@ -0,0 +1,82 @@
+from sqlalchemy import text
+
+from review_stats import STATS_COLUMNS
+
+PAGE_SIZE = 50
+
+# Every field is matched with ILIKE so the pg_trgm GIN indexes in schema.sql
+# can serve the leading-wildcard pattern. Matches are ranked by where the
+# query hits: an exact ISBN first, then a whole title/author, then a field
+# that starts with the query, then a word that starts with it, then any other
+# substring. Within a tier shorter titles are tighter matches. These checks
+# are plain ILIKEs, so ranking stays cheap even when a common word matches a
+# large share of the catalogue. Review aggregates are joined in only for the
+# page of results being returned.
+SEARCH_SQL = """
+SELECT m.isbn, m.title, m.author, m.year, m.score, m.title_len, {stats}
+FROM (
+    SELECT * FROM (
+        SELECT isbn, title, author, year, length(title) AS title_len,
+               CASE
+                   WHEN isbn = :q THEN 5
+                   WHEN title ILIKE :exact OR author ILIKE :exact THEN 4
+                   WHEN isbn ILIKE :prefix OR title ILIKE :prefix OR author ILIKE :prefix THEN 3
+                   WHEN title ILIKE :word OR author ILIKE :word THEN 2
+                   ELSE 1
+               END AS score
+        FROM books
+        WHERE isbn ILIKE :like OR title ILIKE :like OR author ILIKE :like
+    ) matches
+    {after}
+    ORDER BY score DESC, title_len, isbn
+    LIMIT :limit
+) m
+LEFT JOIN book_stats s ON s.isbn = m.isbn
+ORDER BY m.score DESC, m.title_len, m.isbn
+"""
+
+# Keyset condition for "rows after the cursor" in the ORDER BY above. The
+# score is negated so all three keys compare in the same direction.
+AFTER_SQL = "WHERE (-score, title_len, isbn) > (:after_score, :after_len, :after_isbn)"
+
+
+def escape_like(q):
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def encode_cursor(row):
+    return f"{-row.score}:{row.title_len}:{row.isbn}"
+
+
+def decode_cursor(cursor):
+    parts = (cursor or "").split(":", 2)
+    if len(parts) != 3:
+        return None
+    try:
+        return int(parts[0]), int(parts[1]), parts[2]
+    except ValueError:
+        return None
+
+
+def search_books(db, q, after=None, limit=PAGE_SIZE):
+    escaped = escape_like(q)
+    params = {
+        "q": q,
+        "exact": escaped,
+        "prefix": f"{escaped}%",
+        "word": f"% {escaped}%",
+        "like": f"%{escaped}%",
+        "limit": limit + 1,
+    }
+
+    position = decode_cursor(after)
+    if position:
+        params["after_score"], params["after_len"], params["after_isbn"] = position
+
+    rows = db.execute(
+        text(SEARCH_SQL.format(after=AFTER_SQL if position else "", stats=STATS_COLUMNS)),
+        params
+    ).fetchall()
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,125 @@
+import os
+import json
+import secrets
+from datetime import timedelta
+
+from flask.sessions import SessionInterface, SessionMixin
+from flask_session import Session
+from sqlalchemy import text
+from werkzeug.datastructures import CallbackDict
+
+SESSION_LIFETIME = timedelta(hours=int(os.getenv("SESSION_LIFETIME_HOURS", "24")))
+
+
+class PostgresSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False, remaining=None):
+        def on_update(self):
+            self.modified = True
+
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.remaining = remaining
+        self.modified = False
+
+
+class PostgresSessionInterface(SessionInterface):
+    """Server-side sessions in the `sessions` table.
+
+    The cookie only carries a random session id. A session is written when
+    its contents change, or when less than half of its lifetime is left, so
+    ordinary page views cost one primary-key read and no write. Expired rows
+    are ignored on read and removed by purge_sessions.py.
+    """
+
+    def __init__(self, engine, lifetime=SESSION_LIFETIME):
+        self.engine = engine
+        self.lifetime = lifetime
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            with self.engine.connect() as conn:
+                row = conn.execute(
+                    text(
+                        "SELECT data, EXTRACT(EPOCH FROM expires_at - NOW()) AS remaining "
+                        "FROM sessions WHERE sid = :sid AND expires_at > NOW()"
+                    ),
+                    {"sid": sid}
+                ).fetchone()
+            if row:
+                return PostgresSession(row.data, sid=sid, remaining=float(row.remaining))
+
+        return PostgresSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                with self.engine.begin() as conn:
+                    conn.execute(text("DELETE FROM sessions WHERE sid = :sid"), {"sid": session.sid})
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        stale = session.remaining is not None and session.remaining < self.lifetime.total_seconds() / 2
+        if not (session.modified or session.new or stale):
+            return
+
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO sessions (sid, data, expires_at) "
+                    "VALUES (:sid, CAST(:data AS JSONB), NOW() + make_interval(secs => :ttl)) "
+                    "ON CONFLICT (sid) DO UPDATE SET data = EXCLUDED.data, expires_at = EXCLUDED.expires_at"
+                ),
+                {"sid": session.sid, "data": json.dumps(dict(session)), "ttl": self.lifetime.total_seconds()}
+            )
+
+        if session.new:
+            response.set_cookie(
+                name,
+                session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
+
+
+def purge_expired_sessions(engine, batch_size=10000):
+    # Deletes in batches so a large backlog does not hold one long lock.
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            deleted = conn.execute(
+                text(
+                    "DELETE FROM sessions WHERE sid IN ("
+                    "SELECT sid FROM sessions WHERE expires_at <= NOW() LIMIT :n)"
+                ),
+                {"n": batch_size}
+            ).rowcount
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def init_sessions(app, engine, backend):
+    # filesystem: Flask-Session files in flask_session/ (single host only).
+    # postgres:   server-side sessions in the sessions table.
+    # cookie:     Flask's signed cookie; no server-side storage at all.
+    if backend == "postgres":
+        app.session_interface = PostgresSessionInterface(engine)
+    elif backend == "cookie":
+        if not os.getenv("SECRET_KEY"):
+            raise RuntimeError("SECRET_KEY is not set")
+        app.secret_key = os.getenv("SECRET_KEY")
+    elif backend == "filesystem":
+        app.config["SESSION_TYPE"] = "filesystem"
+        Session(app)
+    else:
+        raise RuntimeError(f"Unknown SESSION_BACKEND: {backend}")
@@ -0,0 +1,292 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from heapq import nsmallest
+
+from sqlalchemy import text
+
+# Index keys are the lower-cased text from the start of a field, or from the
+# start of any later word in the title or author, cut to KEY_BYTES bytes of
+# UTF-8. Longer queries are matched on their first KEY_BYTES bytes and then
+# checked against the full field.
+KEY_BYTES = 16
+# How many index entries a query may look at before ranking. Short, common
+# prefixes ("the") match far more entries than could ever be shown; their
+# best books are worked out when the index is built instead.
+SCAN_LIMIT = 400
+# The most suggestions one request can ask for.
+MAX_SUGGESTIONS = 50
+# Books kept per common prefix. More than MAX_SUGGESTIONS so that books
+# superseded by the delta table can be skipped without running short.
+TOP_KEPT = 2 * MAX_SUGGESTIONS
+
+BOOKS_SQL = "SELECT isbn, title, author FROM books {where} ORDER BY isbn"
+
+# updated_at is the writing transaction's start time, so a row can commit
+# with a timestamp older than rows already read. The next load therefore
+# starts from the oldest transaction still open when this one was read.
+WATERMARK_SQL = (
+    "SELECT CAST(COALESCE(MIN(xact_start), NOW()) AS TIMESTAMP) FROM pg_stat_activity "
+    "WHERE datname = current_database() AND xact_start IS NOT NULL"
+)
+
+
+def normalize(value):
+    return " ".join(value.casefold().split())
+
+
+def encode_key(value):
+    return value.encode("utf-8")[:KEY_BYTES].ljust(KEY_BYTES, b"\0")
+
+
+class Keys:
+    """Fixed-width sorted keys packed into one bytes object, for bisect."""
+
+    def __init__(self, blob):
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.blob) // KEY_BYTES
+
+    def __getitem__(self, i):
+        return self.blob[i * KEY_BYTES:(i + 1) * KEY_BYTES]
+
+
+class KeyTable:
+    """Sorted keys with the book number each one belongs to.
+
+    For every prefix matching more than SCAN_LIMIT entries, `top` holds the
+    TOP_KEPT best books (by `order`) that have a key starting with it.
+    """
+
+    def __init__(self, entries, order):
+        entries.sort()
+        self.keys = Keys(b"".join(key for key, _ in entries))
+        self.ids = array("I", (n for _, n in entries))
+        self.top = {}
+        self._collect_top(0, len(self.ids), 0, order)
+
+    def _collect_top(self, lo, hi, depth, order):
+        if hi - lo <= SCAN_LIMIT or depth == KEY_BYTES:
+            return nsmallest(TOP_KEPT, set(self.ids[lo:hi]), key=order.__getitem__)
+
+        # Common prefix: merge the best books of each longer prefix under it.
+        best = set()
+        i = lo
+        while i < hi:
+            child = self.keys[i][:depth + 1]
+            j = bisect_left(self.keys, child + b"\xff", i, hi)
+            best.update(self._collect_top(i, j, depth + 1, order))
+            i = j
+
+        best = nsmallest(TOP_KEPT, best, key=order.__getitem__)
+        if depth:
+            self.top[self.keys[lo][:depth]] = array("I", best)
+        return best
+
+    def candidates(self, prefix):
+        top = self.top.get(prefix)
+        if top is not None:
+            return top
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + b"\xff", lo)
+        # Only a query longer than KEY_BYTES can land here with a range
+        # larger than SCAN_LIMIT; its matches still need checking in full.
+        return self.ids[lo:hi]
+
+    def nbytes(self):
+        return (len(self.keys.blob) + self.ids.itemsize * len(self.ids)
+                + sum(len(prefix) + ids.itemsize * len(ids) for prefix, ids in self.top.items()))
+
+
+class PrefixTable:
+    """An immutable prefix index over a list of books.
+
+    Book fields are kept in one string with an offsets array and the keys in
+    one bytes blob with a parallel array of book numbers rather than as
+    Python objects, so the finished index costs about 170 bytes per book.
+    Building it briefly takes several times that. Keys for the start of
+    a field and for later words are kept apart, so a common prefix keeps the
+    best matches of each kind.
+    """
+
+    def __init__(self, rows):
+        records = []
+        starts = []
+        words = []
+        for isbn, title, author in rows:
+            n = len(records)
+            records.append(f"{isbn}\x1f{title}\x1f{author}")
+            start_keys = {isbn.casefold()}
+            word_keys = set()
+            for field in (normalize(title), normalize(author)):
+                parts = field.split(" ")
+                start_keys.add(field)
+                word_keys.update(" ".join(parts[i:]) for i in range(1, len(parts)))
+            starts.extend((encode_key(key), n) for key in start_keys if key)
+            words.extend((encode_key(key), n) for key in word_keys if key)
+
+        # Position of each book in rank() order within a tier.
+        order = array("I", [0] * len(records))
+        for position, n in enumerate(sorted(range(len(records)), key=lambda n: tier_order(records[n]))):
+            order[n] = position
+
+        self.starts = KeyTable(starts, order)
+        self.words = KeyTable(words, order)
+
+        self.offsets = array("I", [0])
+        for record in records:
+            self.offsets.append(self.offsets[-1] + len(record))
+        self.text = "".join(records)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def book(self, n):
+        return self.text[self.offsets[n]:self.offsets[n + 1]].split("\x1f")
+
+    def candidates(self, q):
+        prefix = q.encode("utf-8")[:KEY_BYTES]
+        return set(self.starts.candidates(prefix)) | set(self.words.candidates(prefix))
+
+    def nbytes(self):
+        return (self.starts.nbytes() + self.words.nbytes()
+                + self.offsets.itemsize * len(self.offsets) + len(self.text.encode("utf-8")))
+
+
+def tier_order(record):
+    isbn, title, _ = record.split("\x1f")
+    return len(title), title, isbn
+
+
+def rank(q, isbn, title, author):
+    # None if the book does not actually match (the key was cut short).
+    # Otherwise lower is better: a field starting with the query beats a
+    # later word doing so, and shorter titles are tighter matches.
+    fields = (isbn.casefold(), normalize(title), normalize(author))
+    if any(field.startswith(q) for field in fields):
+        return 0, len(title), title, isbn
+    if any(f" {q}" in field for field in fields[1:]):
+        return 1, len(title), title, isbn
+    return None
+
+
+class SuggestIndex:
+    """Typeahead over titles, authors and ISBNs, held in memory per worker.
+
+    The whole catalogue is indexed in a background thread by start_build()
+    (or in the caller by build()); until that finishes, suggest() returns
+    no matches rather than making queries wait. Rows inserted or changed
+    later (books.updated_at, set by import.py) are picked up every
+    `refresh_interval` seconds into a small delta table that takes
+    precedence over the main one. The main table is rebuilt once the delta
+    grows past `rebuild_ratio` of it.
+    """
+
+    def __init__(self, engine, refresh_interval=30.0, rebuild_ratio=0.1):
+        self.engine = engine
+        self.refresh_interval = refresh_interval
+        self.rebuild_ratio = rebuild_ratio
+
+        self.main = PrefixTable([])
+        self.delta = PrefixTable([])
+        self.delta_rows = {}
+        self.since = None
+        self.checked_at = 0.0
+        self.built = False
+        self.build_retry_at = 0.0
+        self._build_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def build(self):
+        rows, since = self._load(None)
+        self.main, self.delta, self.delta_rows = PrefixTable(rows), PrefixTable([]), {}
+        self.since = since
+        self.checked_at = time.monotonic()
+        self.built = True
+
+    def start_build(self):
+        if self.built or time.monotonic() < self.build_retry_at:
+            return
+        if self._build_lock.acquire(blocking=False):
+            threading.Thread(target=self._build_in_background, daemon=True).start()
+
+    def refresh(self):
+        rows, since = self._load(self.since)
+        self.since = since
+        self.checked_at = time.monotonic()
+        if not rows:
+            return 0
+
+        delta_rows = dict(self.delta_rows)
+        delta_rows.update((isbn, (isbn, title, author)) for isbn, title, author in rows)
+
+        if len(delta_rows) > self.rebuild_ratio * max(len(self.main), 1):
+            self.build()
+        else:
+            self.delta, self.delta_rows = PrefixTable(delta_rows.values()), delta_rows
+        return len(rows)
+
+    def suggest(self, q, limit=10):
+        if not self.built:
+            self.start_build()
+            return []
+
+        if time.monotonic() - self.checked_at > self.refresh_interval:
+            # Refreshed off the request path; queries keep using the current
+            # tables until the new ones are swapped in.
+            if self._refresh_lock.acquire(blocking=False):
+                threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+        q = normalize(q)
+        if not q:
+            return []
+
+        main, delta, delta_rows = self.main, self.delta, self.delta_rows
+        matches = {}
+        for table, ids in ((main, main.candidates(q)), (delta, delta.candidates(q))):
+            for n in ids:
+                isbn, title, author = table.book(n)
+                if table is main and isbn in delta_rows:
+                    continue
+                score = rank(q, isbn, title, author)
+                if score is not None:
+                    matches[isbn] = (score, {"isbn": isbn, "title": title, "author": author})
+
+        return [book for _, book in sorted(matches.values(), key=lambda m: m[0])[:limit]]
+
+    def stats(self):
+        return {
+            "rows": len(self.main) + len(self.delta),
+            "delta_rows": len(self.delta),
+            "bytes": self.main.nbytes() + self.delta.nbytes(),
+        }
+
+    def _build_in_background(self):
+        try:
+            self.build()
+        except Exception:
+            # Try again after the next interval.
+            self.build_retry_at = time.monotonic() + self.refresh_interval
+        finally:
+            self._build_lock.release()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception:
+            # Try again after the next interval.
+            self.checked_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def _load(self, since):
+        where, params = "", {}
+        if since is not None:
+            where, params = "WHERE updated_at >= :since", {"since": since}
+
+        with self.engine.connect() as conn:
+            watermark = conn.execute(text(WATERMARK_SQL)).scalar()
+            rows = conn.execute(text(BOOKS_SQL.format(where=where)), params).fetchall()
+        return [tuple(row) for row in rows], watermark
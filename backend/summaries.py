@@ -0,0 +1,72 @@
+import hashlib
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+
+def description_hash(description):
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+
+def stored_summary(engine, isbn, description):
+    with engine.connect() as conn:
+        return conn.execute(
+            text(
+                "SELECT summary FROM book_summaries "
+                "WHERE isbn = :isbn AND description_hash = :h"
+            ),
+            {"isbn": isbn, "h": description_hash(description)}
+        ).scalar()
+
+
+def stored_summaries(engine, descriptions):
+    # {isbn: description} -> {isbn: summary} for the ones already summarized.
+    if not descriptions:
+        return {}
+    isbns = list(descriptions)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT s.isbn, s.summary FROM book_summaries s "
+                "JOIN unnest(CAST(:isbns AS TEXT[]), CAST(:hashes AS TEXT[])) AS d(isbn, h) "
+                "ON s.isbn = d.isbn AND s.description_hash = d.h"
+            ),
+            {"isbns": isbns, "hashes": [description_hash(descriptions[isbn]) for isbn in isbns]}
+        )
+        return {row.isbn: row.summary for row in rows}
+
+
+def save_summary(engine, isbn, description, summary):
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO book_summaries (isbn, description_hash, summary) "
+                "VALUES (:isbn, :h, :s) "
+                "ON CONFLICT (isbn, description_hash) DO NOTHING"
+            ),
+            {"isbn": isbn, "h": description_hash(description), "s": summary}
+        )
+
+
+def book_summary(engine, isbn, description, summarize, generate=True):
+    # Summaries are keyed by ISBN and a hash of the description they were made
+    # from, so a book is only sent to the LLM again if Google's description
+    # for it changes. With generate=False this never calls the LLM.
+    if not description:
+        return None
+
+    try:
+        summary = stored_summary(engine, isbn, description)
+    except SQLAlchemyError:
+        summary = None
+
+    if summary or not generate:
+        return summary
+
+    summary = summarize(description)
+    if summary:
+        try:
+            save_summary(engine, isbn, description, summary)
+        except SQLAlchemyError:
+            pass
+    return summary
@@ -0,0 +1,86 @@
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from application import engine, metadata_cache, fetch_google_books, gemini_summarize
+from ratelimit import TokenBucket
+from summaries import book_summary, stored_summary
+
+BATCH_SIZE = 500
+
+
+def pending_batches(include_summarized):
+    # Walks books in ISBN order one batch at a time so the whole catalogue is
+    # never held in memory (Executor.map would queue every item up front).
+    last = ""
+    while True:
+        with engine.connect() as conn:
+            isbns = conn.execute(
+                text(
+                    "SELECT b.isbn FROM books b "
+                    "WHERE b.isbn > :last "
+                    + ("" if include_summarized else
+                       "AND NOT EXISTS (SELECT 1 FROM book_summaries s WHERE s.isbn = b.isbn) ")
+                    + "ORDER BY b.isbn LIMIT :n"
+                ),
+                {"last": last, "n": BATCH_SIZE}
+            ).scalars().all()
+
+        if not isbns:
+            return
+        yield isbns
+        last = isbns[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate Gemini summaries for the catalogue")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1.0, help="max Gemini requests per second")
+    parser.add_argument("--google-rate", type=float, default=5.0, help="max Google Books requests per second")
+    parser.add_argument("--all", action="store_true",
+                        help="also re-check books that already have a summary (picks up changed descriptions)")
+    args = parser.parse_args()
+
+    if not os.getenv("GEMINI_API_KEY"):
+        raise RuntimeError("GEMINI_API_KEY is not set")
+
+    gemini_bucket = TokenBucket(args.rate)
+    google_bucket = TokenBucket(args.google_rate)
+    counts = {"seen": 0, "summarized": 0, "existing": 0, "no_description": 0, "failed": 0}
+
+    def fetch_google(isbn):
+        google_bucket.acquire()
+        return fetch_google_books(isbn)
+
+    def summarize(description):
+        gemini_bucket.acquire()
+        return gemini_summarize(description)
+
+    def process(isbn):
+        ginfo = metadata_cache.get(isbn, fetch_google)
+        description = ginfo.get("description") if ginfo else None
+
+        if not description:
+            return "no_description"
+        if stored_summary(engine, isbn, description):
+            return "existing"
+        return "summarized" if book_summary(engine, isbn, description, summarize) else "failed"
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for batch in pending_batches(args.all):
+            for outcome in pool.map(process, batch):
+                counts["seen"] += 1
+                counts[outcome] += 1
+
+            elapsed = time.perf_counter() - started
+            print(f"{counts['seen']} books, {counts['summarized']} summarized "
+                  f"({counts['seen'] / elapsed:.1f} books/s)")
+
+    print("Done: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import record
+
+# Responses worth retrying: rate limiting and server-side failures.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+
+class UpstreamClient:
+    """HTTP client for one upstream API.
+
+    Keeps a pooled keep-alive session, retries 429/5xx responses and
+    connection errors with exponential backoff and full jitter, and trips a
+    circuit breaker after `failure_threshold` consecutive failed calls. While
+    the breaker is open, calls fail fast with CircuitOpenError; after
+    `reset_timeout` seconds a single trial call is let through and closes
+    the breaker again if it succeeds.
+    """
+
+    def __init__(self, name, base_url, timeout=10, max_retries=2, backoff=0.5, max_backoff=8.0,
+                 failure_threshold=5, reset_timeout=30.0, pool_size=16, headers=None):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.session = requests.Session()
+        self.session.mount(self.base_url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.headers.update(headers or {})
+
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+        self.metrics = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "errors": 0,
+            "short_circuits": 0,
+            "circuit_opened": 0,
+            "latency_sum": 0.0,
+            "latency_buckets": [0] * len(LATENCY_BUCKETS),
+        }
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def request(self, method, path, **kwargs):
+        # Whole call including retries, for the calling request's Server-Timing.
+        start = time.perf_counter()
+        try:
+            return self._request(method, path, **kwargs)
+        finally:
+            record(self.name, time.perf_counter() - start)
+
+    def _request(self, method, path, **kwargs):
+        self._acquire()
+        # Anything that escapes, not just upstream errors, has to settle the
+        # call: a half-open breaker otherwise keeps its trial in flight forever.
+        try:
+            response = self._attempts(method, path, **kwargs)
+        except BaseException:
+            self._record_failure()
+            raise
+        self._record_success()
+        return response
+
+    def _attempts(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            response = None
+            error = None
+            try:
+                response = self.session.request(method, self.base_url + path, **kwargs)
+            except requests.RequestException as exc:
+                error = exc
+            self._observe(time.perf_counter() - start)
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+
+            if attempt >= self.max_retries:
+                if error is not None:
+                    raise UpstreamError(f"{self.name}: {error}") from error
+                raise UpstreamError(f"{self.name}: HTTP {response.status_code}")
+
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            retry_after = response.headers.get("Retry-After") if response is not None else None
+            if retry_after and retry_after.isdigit():
+                delay = min(self.max_backoff, max(delay, int(retry_after)))
+
+            with self._lock:
+                self.metrics["retries"] += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.metrics, state=self._state)
+            stats["latency_buckets"] = dict(zip(LATENCY_BUCKETS, self.metrics["latency_buckets"]))
+            return stats
+
+    def _acquire(self):
+        with self._lock:
+            self.metrics["calls"] += 1
+
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.metrics["short_circuits"] += 1
+                    raise CircuitOpenError(f"{self.name}: circuit open")
+                self._state = "half_open"
+
+            if self._state == "half_open":
+                if self._trial_in_flight:
+                    self.metrics["short_circuits"] += 1
+                    raise CircuitOpenError(f"{self.name}: circuit half-open, trial in flight")
+                self._trial_in_flight = True
+
+    def _observe(self, seconds):
+        with self._lock:
+            self.metrics["attempts"] += 1
+            self.metrics["latency_sum"] += seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.metrics["latency_buckets"][i] += 1
+                    break
+
+    def _record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def _record_failure(self):
+        with self._lock:
+            self.metrics["errors"] += 1
+            self._failures += 1
+            self._trial_in_flight = False
+
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.metrics["circuit_opened"] += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
@@ -0,0 +1,120 @@
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from application import engine, metadata_cache, fetch_google_books
+from ratelimit import TokenBucket
+
+BATCH_SIZE = 500
+
+# Books with no cached metadata, or whose entry expires within :ahead
+# seconds (:miss_ahead for books Google did not know, which are cached for
+# less time) and was not already refreshed during this pass. Recently
+# searched/viewed books come first (most recent first), then the rest of the
+# catalogue, entries closest to expiry first.
+DUE_SQL = """
+SELECT b.isbn
+FROM books b
+LEFT JOIN book_metadata m ON m.isbn = b.isbn
+LEFT JOIN book_activity a ON a.isbn = b.isbn
+WHERE (m.isbn IS NULL
+       OR (m.fetched_at < :pass_started
+           AND m.expires_at < NOW() + make_interval(secs => CASE WHEN m.data IS NULL THEN :miss_ahead ELSE :ahead END)))
+  AND b.isbn <> ALL(:skip)
+ORDER BY a.last_seen_at DESC NULLS LAST, m.expires_at NULLS FIRST, b.isbn
+LIMIT :n
+"""
+
+
+def due_batch(pass_started, ahead, miss_ahead, skip):
+    with engine.connect() as conn:
+        return conn.execute(
+            text(DUE_SQL),
+            {"pass_started": pass_started, "ahead": ahead, "miss_ahead": miss_ahead,
+             "skip": list(skip), "n": BATCH_SIZE}
+        ).scalars().all()
+
+
+def horizons(ahead):
+    # An entry has to be written with more time left than the horizon it is
+    # checked against, or the next pass finds it due again straight away.
+    return min(ahead, metadata_cache.ttl / 2), min(ahead, metadata_cache.negative_ttl / 2)
+
+
+def warm_pass(pool, bucket, ahead):
+    # Refreshes everything that is due, one batch at a time. Each batch is
+    # picked afresh, so books searched or viewed during a long pass move to
+    # the front. Books refreshed in this pass are not picked again, and ones
+    # whose lookup fails (or whose entry could not be stored) are skipped for
+    # the rest of the pass, so the pass always ends.
+    counts = {"warmed": 0, "not_found": 0, "failed": 0}
+    skip = set()
+
+    def fetch(isbn):
+        bucket.acquire()
+        return fetch_google_books(isbn)
+
+    def process(isbn):
+        errors = []
+
+        def tracked(i):
+            try:
+                return fetch(i)
+            except Exception:
+                errors.append(i)
+                raise
+
+        value = metadata_cache.refresh(isbn, tracked)
+        if errors:
+            skip.add(isbn)
+            return "failed"
+        return "warmed" if value is not None else "not_found"
+
+    with engine.connect() as conn:
+        pass_started = conn.execute(text("SELECT NOW()")).scalar()
+
+    started = time.perf_counter()
+    while True:
+        batch = due_batch(pass_started, *horizons(ahead), skip)
+        if not batch:
+            return counts
+
+        store_errors = metadata_cache.stats()["store_errors"]
+        for outcome in pool.map(process, batch):
+            counts[outcome] += 1
+        if metadata_cache.stats()["store_errors"] > store_errors:
+            # Entries that were not written would be picked again straight
+            # away. Which ones is not known, so skip the whole batch.
+            skip.update(batch)
+
+        done = sum(counts.values())
+        print(f"{done} books refreshed, {counts['failed']} failed "
+              f"({done / (time.perf_counter() - started):.1f} books/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch and refresh Google Books metadata ahead of visitors")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=5.0, help="max Google Books requests per second")
+    parser.add_argument("--ahead", type=float, default=24.0,
+                        help="refresh entries that expire within this many hours")
+    parser.add_argument("--every", type=int, help="keep running, starting a new pass every N seconds")
+    args = parser.parse_args()
+
+    if not os.getenv("GOOGLE_BOOKS_API_KEY"):
+        print("GOOGLE_BOOKS_API_KEY is not set; using the unauthenticated quota")
+
+    bucket = TokenBucket(args.rate)
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        while True:
+            counts = warm_pass(pool, bucket, args.ahead * 3600)
+            print("Pass done: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+            if not args.every:
+                return
+            time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
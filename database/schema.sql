@@ -1,3 +1,10 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+DROP TABLE IF EXISTS sessions CASCADE;
+DROP TABLE IF EXISTS book_activity CASCADE;
+DROP TABLE IF EXISTS book_stats CASCADE;
+DROP TABLE IF EXISTS book_summaries CASCADE;
+DROP TABLE IF EXISTS book_metadata CASCADE;
 DROP TABLE IF EXISTS reviews CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
 DROP TABLE IF EXISTS books CASCADE;
@@ -13,7 +20,10 @@ CREATE TABLE books (
     isbn VARCHAR(20) PRIMARY KEY,
     title TEXT NOT NULL,
     author TEXT NOT NULL,
-    year INT NOT NULL
+    year INT NOT NULL,
+    -- Set on insert and whenever import.py changes the row; the typeahead
+    -- index in each worker polls it for new and changed books.
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
 CREATE TABLE reviews (
@@ -27,5 +37,135 @@ CREATE TABLE reviews (
 );
 
 
-CREATE INDEX idx_reviews_isbn ON reviews(isbn);
+-- Serves the book page's newest-first review pages, including keyset
+-- pagination over (created_at, id); also covers lookups by isbn alone.
+CREATE INDEX idx_reviews_isbn_created ON reviews(isbn, created_at DESC, id DESC);
 CREATE INDEX idx_reviews_user_id ON reviews(user_id);
+
+-- Trigram indexes let the search route's ILIKE '%q%' filter use an index
+-- instead of scanning every book.
+CREATE INDEX idx_books_isbn_trgm ON books USING gin (isbn gin_trgm_ops);
+CREATE INDEX idx_books_title_trgm ON books USING gin (title gin_trgm_ops);
+CREATE INDEX idx_books_author_trgm ON books USING gin (author gin_trgm_ops);
+CREATE INDEX idx_books_updated_at ON books(updated_at);
+
+-- Cached Google Books volume info, shared by every worker. data is NULL when
+-- Google has no record of the ISBN (a cached miss, with a shorter expiry).
+CREATE TABLE book_metadata (
+    isbn VARCHAR(20) PRIMARY KEY REFERENCES books(isbn) ON DELETE CASCADE,
+    data JSONB,
+    fetched_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX idx_book_metadata_expires_at ON book_metadata(expires_at);
+
+-- When each book was last shown in search results or opened, flushed in
+-- batches by the web workers. backend/warm_metadata.py refreshes metadata for
+-- recently active books first.
+CREATE TABLE book_activity (
+    isbn VARCHAR(20) PRIMARY KEY REFERENCES books(isbn) ON DELETE CASCADE,
+    last_seen_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    hits BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX idx_book_activity_last_seen_at ON book_activity(last_seen_at DESC);
+
+-- Gemini summaries, keyed by the hash of the description they summarize so a
+-- book is only re-summarized when its description changes.
+CREATE TABLE book_summaries (
+    isbn VARCHAR(20) NOT NULL REFERENCES books(isbn) ON DELETE CASCADE,
+    description_hash CHAR(64) NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (isbn, description_hash)
+);
+
+-- Per-book review aggregates, kept current by the triggers below so pages can
+-- read a book's review count, average and histogram without scanning reviews.
+-- Rebuild from scratch with backend/rebuild_stats.py.
+CREATE TABLE book_stats (
+    isbn VARCHAR(20) PRIMARY KEY REFERENCES books(isbn) ON DELETE CASCADE,
+    rating_count INT NOT NULL DEFAULT 0,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    rating_1 INT NOT NULL DEFAULT 0,
+    rating_2 INT NOT NULL DEFAULT 0,
+    rating_3 INT NOT NULL DEFAULT 0,
+    rating_4 INT NOT NULL DEFAULT 0,
+    rating_5 INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Statement-level triggers with transition tables: one aggregate update per
+-- book per statement, however many reviews the statement touched. Removed
+-- rows are subtracted with a plain UPDATE (the stats row may already be gone
+-- if the book itself is being deleted); added rows are upserted.
+CREATE OR REPLACE FUNCTION book_stats_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE book_stats s SET
+            rating_count = s.rating_count - d.n,
+            rating_sum = s.rating_sum - d.total,
+            rating_1 = s.rating_1 - d.r1,
+            rating_2 = s.rating_2 - d.r2,
+            rating_3 = s.rating_3 - d.r3,
+            rating_4 = s.rating_4 - d.r4,
+            rating_5 = s.rating_5 - d.r5,
+            updated_at = NOW()
+        FROM (
+            SELECT isbn, COUNT(*) AS n, SUM(rating) AS total,
+                   COUNT(*) FILTER (WHERE rating = 1) AS r1,
+                   COUNT(*) FILTER (WHERE rating = 2) AS r2,
+                   COUNT(*) FILTER (WHERE rating = 3) AS r3,
+                   COUNT(*) FILTER (WHERE rating = 4) AS r4,
+                   COUNT(*) FILTER (WHERE rating = 5) AS r5
+            FROM old_rows GROUP BY isbn
+        ) d
+        WHERE s.isbn = d.isbn;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO book_stats AS s (isbn, rating_count, rating_sum, rating_1, rating_2, rating_3, rating_4, rating_5)
+        SELECT isbn, COUNT(*), SUM(rating),
+               COUNT(*) FILTER (WHERE rating = 1),
+               COUNT(*) FILTER (WHERE rating = 2),
+               COUNT(*) FILTER (WHERE rating = 3),
+               COUNT(*) FILTER (WHERE rating = 4),
+               COUNT(*) FILTER (WHERE rating = 5)
+        FROM new_rows GROUP BY isbn
+        ON CONFLICT (isbn) DO UPDATE SET
+            rating_count = s.rating_count + EXCLUDED.rating_count,
+            rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+            rating_1 = s.rating_1 + EXCLUDED.rating_1,
+            rating_2 = s.rating_2 + EXCLUDED.rating_2,
+            rating_3 = s.rating_3 + EXCLUDED.rating_3,
+            rating_4 = s.rating_4 + EXCLUDED.rating_4,
+            rating_5 = s.rating_5 + EXCLUDED.rating_5,
+            updated_at = NOW();
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER reviews_stats_insert AFTER INSERT ON reviews
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_stats_apply();
+
+CREATE TRIGGER reviews_stats_update AFTER UPDATE ON reviews
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_stats_apply();
+
+CREATE TRIGGER reviews_stats_delete AFTER DELETE ON reviews
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_stats_apply();
+
+-- Server-side sessions for SESSION_BACKEND=postgres. Expired rows are removed
+-- by backend/purge_sessions.py.
+CREATE TABLE sessions (
+    sid VARCHAR(64) PRIMARY KEY,
+    data JSONB NOT NULL,
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX idx_sessions_expires_at ON sessions(expires_at);